@@ -0,0 +1,361 @@
+import argparse, csv, json, math, os, resource, statistics, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_DIRS = ["project1-tests", "project1-revised-tests"]
+CNF_SUFFIXES = (".cnf", ".cnf.gz", ".cnf.xz", ".cnf.bz2")
+SOLVERS = ("vsids", "original")
+MEMOUT_EXIT = 3  # exit code of a child that ran out of memory
+
+
+@dataclass
+class Instance:
+    path: str
+    expected: Optional[str]  # "sat" or "unsat" for files in a sat/ or unsat/ directory
+
+
+@dataclass
+class RunResult:
+    instance: str
+    expected: Optional[str]
+    status: str  # "sat", "unsat", "wrong", "timeout", "memout" or "error"
+    run: int = 0
+    parse_time: Optional[float] = None
+    solve_time: Optional[float] = None
+    conflicts: Optional[int] = None
+    decisions: Optional[int] = None
+    propagations: Optional[int] = None
+    max_rss_mb: Optional[float] = None
+    message: str = ""
+
+
+@dataclass
+class Comparison:
+    instance: str
+    base_mean: float
+    new_mean: float
+    ratio: float  # new_mean / base_mean
+    p_value: Optional[float]  # one-sided Welch t-test, None with fewer than two runs on a side
+    slowdown: bool
+
+
+def find_instances(directories: Sequence[str]) -> List[Instance]:
+    """
+    Return the CNF files under the directories, sorted by path. The expected
+    answer is taken from the name of a sat/ or unsat/ parent directory.
+    """
+    instances = []
+    for directory in directories:
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames.sort()
+            expected = os.path.basename(dirpath)
+            for filename in sorted(filenames):
+                if filename.endswith(CNF_SUFFIXES):
+                    instances.append(Instance(os.path.join(dirpath, filename),
+                                              expected if expected in ("sat", "unsat") else None))
+    return instances
+
+
+def run_child(solver: str, path: str, memory_mb: Optional[int] = None) -> Dict:
+    """
+    Solve one instance in this process, limited to memory_mb megabytes, and
+    return its measurements.
+    """
+    if memory_mb is not None:
+        # RLIMIT_RSS is not enforced by Linux, so the address space is limited instead
+        size = memory_mb << 20
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    from budget import peak_rss_mb
+    from dimacs import read_dimacs
+    # imported before the clock starts, so parse_time is only the parsing
+    if solver == "original":
+        from cdcl_solver_original import cdcl_solve
+    else:
+        from cdcl_solver import cdcl_solve
+
+    start = time.perf_counter()
+    stats = {}
+    if solver == "original":
+        # read_dimacs also handles compressed files
+        formula = read_dimacs(path, strict=False).to_formula()
+        parse_time = time.perf_counter() - start
+        result = cdcl_solve(formula)
+    else:
+        formula = read_dimacs(path)
+        parse_time = time.perf_counter() - start
+        result = cdcl_solve(formula, stats=stats)
+    solve_time = time.perf_counter() - start - parse_time
+
+    if result is None:
+        status = "unsat"
+    else:
+        status = "sat" if result.satisfy(formula) else "wrong"
+    return {
+        "status": status,
+        "parse_time": parse_time,
+        "solve_time": solve_time,
+        "conflicts": stats.get("conflicts"),
+        "decisions": stats.get("decisions"),
+        "propagations": stats.get("propagations"),
+        "max_rss_mb": peak_rss_mb(),
+        "message": "model does not satisfy the formula" if status == "wrong" else "",
+    }
+
+
+def run_instance(instance: Instance, solver: str, timeout: Optional[float], memory_mb: Optional[int],
+                 run: int = 0) -> RunResult:
+    """
+    Solve an instance in a new Python process, killed after timeout seconds
+    and limited to memory_mb megabytes.
+    """
+    # the child limits its own memory: preexec_fn is not safe in the threads of run_benchmark
+    command = [sys.executable, os.path.abspath(__file__), "--child", solver, instance.path]
+    if memory_mb is not None:
+        command += ["--child-memory", str(memory_mb)]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        out, err = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        return RunResult(instance.path, instance.expected, "timeout", run)
+
+    if proc.returncode == MEMOUT_EXIT:
+        return RunResult(instance.path, instance.expected, "memout", run)
+    if proc.returncode != 0 or not out.strip():
+        lines = err.strip().splitlines()
+        message = lines[-1] if lines else f"exit code {proc.returncode}"
+        return RunResult(instance.path, instance.expected, "error", run, message=message)
+
+    result = RunResult(instance.path, instance.expected, run=run, **json.loads(out.splitlines()[-1]))
+    if instance.expected is not None and result.status in ("sat", "unsat") and result.status != instance.expected:
+        result.message = f"answered {result.status}, expected {instance.expected}"
+        result.status = "wrong"
+    return result
+
+
+def run_benchmark(instances: Sequence[Instance], solver: str = "vsids", jobs: int = 1,
+                  timeout: Optional[float] = None, memory_mb: Optional[int] = None,
+                  repeat: int = 1, progress: bool = True) -> List[RunResult]:
+    """
+    Solve every instance repeat times, jobs instances at a time, and return
+    the results sorted by instance and run.
+    """
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_instance, instance, solver, timeout, memory_mb, run)
+                   for run in range(repeat) for instance in instances]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if progress:
+                time_info = f" in {result.solve_time:.3f} seconds" if result.solve_time is not None else ""
+                print(f"[{len(results)}/{len(futures)}] {result.instance}: {result.status}{time_info}", flush=True)
+    results.sort(key=lambda r: (r.instance, r.run))
+    return results
+
+
+def write_json(path: str, results: Sequence[RunResult], **metadata):
+    with open(path, "w") as f:
+        json.dump(dict(metadata, results=[asdict(r) for r in results]), f, indent=1)
+
+
+def read_json(path: str) -> List[RunResult]:
+    with open(path) as f:
+        return [RunResult(**r) for r in json.load(f)["results"]]
+
+
+def write_csv(path: str, results: Sequence[RunResult]):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([field.name for field in fields(RunResult)])
+        for r in results:
+            writer.writerow(["" if value is None else value for value in asdict(r).values()])
+
+
+def _continued_fraction(a: float, b: float, x: float) -> float:
+    # continued fraction of the incomplete beta function (modified Lentz)
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        for aa in (m * (b - m) * x / ((a - 1.0 + m2) * (a + m2)),
+                   -(a + m) * (a + b + m) * x / ((a + m2) * (a + 1.0 + m2))):
+            d = 1.0 + aa * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + aa / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 1e-14:
+            break
+    return h
+
+
+def incomplete_beta(a: float, b: float, x: float) -> float:
+    """
+    Regularized incomplete beta function I_x(a, b).
+    """
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _continued_fraction(a, b, x) / a
+    return 1.0 - front * _continued_fraction(b, a, 1.0 - x) / b
+
+
+def t_sf(t: float, df: float) -> float:
+    """
+    P(T > t) for Student's t distribution with df degrees of freedom.
+    """
+    tail = 0.5 * incomplete_beta(df / 2.0, 0.5, df / (df + t * t))
+    return tail if t >= 0 else 1.0 - tail
+
+
+def welch_slower(base: Sequence[float], new: Sequence[float]) -> Optional[float]:
+    """
+    One-sided Welch t-test: the p-value of new being slower than base by
+    chance. None if a side has fewer than two samples.
+    """
+    if len(base) < 2 or len(new) < 2:
+        return None
+    vb = statistics.variance(base) / len(base)
+    vn = statistics.variance(new) / len(new)
+    diff = statistics.mean(new) - statistics.mean(base)
+    if vb + vn == 0:
+        return 0.0 if diff > 0 else 1.0
+    t = diff / math.sqrt(vb + vn)
+    df = (vb + vn) ** 2 / (vb * vb / (len(base) - 1) + vn * vn / (len(new) - 1))
+    return t_sf(t, df)
+
+
+def _solve_times(results: Sequence[RunResult]) -> Dict[str, List[float]]:
+    times = {}
+    for r in results:
+        if r.status in ("sat", "unsat"):
+            times.setdefault(r.instance, []).append(r.solve_time)
+    return times
+
+
+def compare(baseline: Sequence[RunResult], results: Sequence[RunResult], alpha: float = 0.05,
+            min_slowdown: float = 0.1, min_seconds: float = 0.05) -> Tuple[List[Comparison], Optional[float]]:
+    """
+    Compare the solve times of the instances solved in both runs.
+
+    An instance is flagged as a slowdown when its mean time grew by more than
+    min_slowdown (relative) and min_seconds, and the Welch t-test puts the
+    chance of that below alpha; with a single run on either side only the
+    thresholds apply. Also return the geometric mean of the time ratios
+    over all compared instances.
+    """
+    base_times = _solve_times(baseline)
+    new_times = _solve_times(results)
+    comparisons = []
+    log_ratios = []
+    for instance in sorted(base_times.keys() & new_times.keys()):
+        base, new = base_times[instance], new_times[instance]
+        base_mean, new_mean = statistics.mean(base), statistics.mean(new)
+        ratio = new_mean / base_mean if base_mean > 0 else math.inf
+        p_value = welch_slower(base, new)
+        slowdown = (ratio > 1 + min_slowdown and new_mean - base_mean > min_seconds and
+                    (p_value is None or p_value < alpha))
+        comparisons.append(Comparison(instance, base_mean, new_mean, ratio, p_value, slowdown))
+        if base_mean > 0 and new_mean > 0:
+            log_ratios.append(math.log(ratio))
+    geomean = math.exp(statistics.mean(log_ratios)) if log_ratios else None
+    return comparisons, geomean
+
+
+def lost_instances(baseline: Sequence[RunResult], results: Sequence[RunResult]) -> List[RunResult]:
+    """
+    Return the results of instances the baseline solved but this run did not
+    (or answered wrongly).
+    """
+    solved = {r.instance for r in baseline if r.status in ("sat", "unsat")}
+    return [r for r in results if r.instance in solved and r.status not in ("sat", "unsat")]
+
+
+# (header, RunResult field, width, format) of the numeric columns
+COLUMNS = [("Parse", "parse_time", 9, ".3f"), ("Solve", "solve_time", 9, ".3f"),
+           ("Conflicts", "conflicts", 10, "d"), ("Decisions", "decisions", 10, "d"),
+           ("Props", "propagations", 11, "d"), ("RSS MB", "max_rss_mb", 7, ".1f")]
+
+
+def print_results(results: Sequence[RunResult]):
+    print(f"{'Instance':<60} {'Result':<8} " + " ".join(f"{header:>{width}}" for header, _, width, _ in COLUMNS))
+    for r in results:
+        cells = []
+        for _, name, width, spec in COLUMNS:
+            value = getattr(r, name)
+            cells.append(f"{value:>{width}{spec}}" if value is not None else f"{'-':>{width}}")
+        print(f"{r.instance:<60} {r.status:<8} " + " ".join(cells))
+        if r.message:
+            print(f"    {r.message}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the solver on benchmark directories, each instance "
+                                                 "in its own process, and compare against a baseline.")
+    parser.add_argument("directories", nargs="*", default=DEFAULT_DIRS,
+                        help="directories searched for CNF files (default: %(default)s)")
+    parser.add_argument("-s", "--solver", choices=SOLVERS, default="vsids")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="instances solved in parallel; more jobs than cores skews the times")
+    parser.add_argument("-t", "--timeout", type=float, default=120.0, help="wall-clock seconds per instance")
+    parser.add_argument("-m", "--memory", type=int, default=4096, help="memory limit per instance in MB")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                        help="runs per instance; at least 2 are needed for significance tests")
+    parser.add_argument("--json", help="write the results to this JSON file")
+    parser.add_argument("--csv", help="write the results to this CSV file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level of slowdowns")
+    parser.add_argument("--min-slowdown", type=float, default=0.1,
+                        help="smallest relative slowdown that is flagged")
+    parser.add_argument("--child", nargs=2, metavar=("SOLVER", "PATH"), help=argparse.SUPPRESS)
+    parser.add_argument("--child-memory", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        try:
+            print(json.dumps(run_child(*args.child, args.child_memory)))
+        except MemoryError:
+            os._exit(MEMOUT_EXIT)
+        return 0
+
+    instances = find_instances(args.directories)
+    results = run_benchmark(instances, args.solver, args.jobs, args.timeout, args.memory, args.repeat)
+    print_results(results)
+    if args.json:
+        write_json(args.json, results, solver=args.solver, timeout=args.timeout, memory_mb=args.memory,
+                   repeat=args.repeat, jobs=args.jobs, created=time.strftime("%Y-%m-%d %H:%M:%S"))
+    if args.csv:
+        write_csv(args.csv, results)
+
+    failed = [r for r in results if r.status in ("wrong", "error")]
+    for r in failed:
+        print(f"FAILED {r.instance}: {r.status} {r.message}".rstrip())
+    regressed = False
+    if args.baseline:
+        baseline = read_json(args.baseline)
+        comparisons, geomean = compare(baseline, results, args.alpha, args.min_slowdown)
+        slowdowns = [c for c in comparisons if c.slowdown]
+        lost = lost_instances(baseline, results)
+        for c in slowdowns:
+            p_value = f", p = {c.p_value:.4f}" if c.p_value is not None else ""
+            print(f"SLOWDOWN {c.instance}: {c.base_mean:.3f} -> {c.new_mean:.3f} seconds "
+                  f"({c.ratio:.2f}x{p_value})")
+        for r in lost:
+            print(f"LOST {r.instance}: {r.status} {r.message}".rstrip())
+        if geomean is not None:
+            print(f"Compared {len(comparisons)} instances, geometric mean time ratio {geomean:.3f}")
+        regressed = bool(slowdowns or lost)
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import resource, sys, time
+from dataclasses import dataclass
+from typing import Optional
+
+from stats import SolverStats
+
+# conflicts + decisions between the checks of the clock, memory and
+# interrupt event; counters are compared on every step
+CHECK_EVERY = 64
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process in megabytes.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+@dataclass
+class Budget:
+    """
+    Resource limits of one solve() call. Conflicts and propagations are
+    counted from the start of the call, seconds are wall-clock seconds, and
+    memory_mb is compared with the peak RSS of the process. interrupt is any
+    object with an is_set() method, such as a threading.Event, that another
+    thread sets to stop the search.
+    """
+    conflicts: Optional[int] = None
+    propagations: Optional[int] = None
+    seconds: Optional[float] = None
+    memory_mb: Optional[float] = None
+    interrupt: Optional[object] = None
+
+    def check(self, deadline: Optional[float]) -> Optional[str]:
+        """
+        The checks that are too costly for every step: return the reason to
+        stop, or None.
+        """
+        if self.interrupt is not None and self.interrupt.is_set():
+            return "interrupted"
+        if deadline is not None and time.perf_counter() >= deadline:
+            return "seconds"
+        if self.memory_mb is not None and peak_rss_mb() > self.memory_mb:
+            return "memory"
+        return None
+
+
+@dataclass
+class Unknown:
+    """
+    Result of a solve that ran out of budget before finding an answer.
+    """
+    reason: str  # "conflicts", "propagations", "seconds", "memory" or "interrupted"
+    stats: SolverStats
+
+    def __bool__(self):
+        raise TypeError("an Unknown result is neither SAT nor UNSAT; check isinstance(result, Unknown) first")
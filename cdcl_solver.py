@@ -1,6 +1,26 @@
-import random, heapq
-from typing import List, Tuple, Optional
+import random, time
+from itertools import chain
+from dataclasses import asdict, replace
+from typing import Dict, Iterator, List, Optional, Union
+from budget import Budget, Unknown
 from common_classes import Literal, Clause, Formula, Assignment
+from dimacs import DimacsCNF, parse_dimacs_bytes
+from inprocess import Inprocessor
+from local_search import PhaseSeeder
+from preprocess import Preprocessor, StepLimit
+from restarts import RestartPolicy
+from solver_core import Solver
+from stats import SolverStats
+from symmetry import break_symmetries
+from xor_gauss import XorPropagator, find_xors, gauss_preprocess
+
+# clauses loaded into the solver between the checks of the budget
+LOAD_CHECK_EVERY = 4096
+
+# symmetry breaking gets at most this share of a seconds budget, and is
+# skipped if that is less than SYMMETRY_MIN_SECONDS
+SYMMETRY_SHARE = 0.1
+SYMMETRY_MIN_SECONDS = 0.05
 
 class Assignments(dict):
     """
@@ -28,323 +48,197 @@ class Assignments(dict):
     def unassign(self, variable: int):
         self.pop(variable)
 
-    def satisfy(self, formula: Formula) -> bool:
+    def satisfy(self, formula: Union[Formula, DimacsCNF]) -> bool:
         """
         Check whether the assignments actually satisfies the formula.
         """
+        if isinstance(formula, DimacsCNF):
+            model = [False] * (formula.num_vars + 1)
+            for var, assignment in self.items():
+                model[var] = assignment.value
+            return formula.satisfied_by(model)
+
         for clause in formula:
             if True not in [self.value(lit) for lit in clause]:
                 return False
 
         return True
 
-# Heuristically determines which variable to select during decision points by tracking variable occurences in a PQ
-class VSIDS:
-    def __init__(self):
-        self.scores = {} # store variable-score pairs for every variable in a formula
-        self.heap = [] # PQ for variable-score pairs, uses functions from heapq module
-        self.conflict_count = 0 # Stores number of conflicts encountered during solving
-        self.decay_interval = 4096  # Decays the score every 256 conflicts
-
-    # Initialize the scores of all variables to zero and update the PQ
-    def initialize_scores(self, variables):
-        for var in variables:
-            self.scores[var] = 0
-            heapq.heappush(self.heap, (-self.scores[var], var))
-
-    # Increase the score, used when a learned clause is added
-    def increment_score(self, clause):
-        for var in clause:
-            if var in self.scores:
-                self.scores[var] += 1
-                heapq.heappush(self.heap, (-self.scores[var], var))
-
-    # Check if enough conflicts have taken place for the scores to be decayed
-    def maybe_decay_scores(self):
-        if self.conflict_count >= self.decay_interval:
-            self.decay_scores()
-            self.conflict_count = 0  # Reset conflict counter after decay
-
-    # Decay all scores in half and rebuild the PQ
-    def decay_scores(self):
-        new_heap = []
-        for var, score in self.scores.items():
-            new_score = score / 2
-            self.scores[var] = new_score
-            heapq.heappush(new_heap, (-new_score, var))
-        self.heap = new_heap
-
-    # Pop from the PQ until a valid score is found
-    def get_best_variable(self):
-        while self.heap:
-            score, var = heapq.heappop(self.heap)
-            if -score == self.scores[var]:  # Check if the score is still valid
-                return var
-        return None
 
-    
-from collections import defaultdict
-def init_watches(formula: Formula):
-    """
-    Return lit2clauses and clause2lits
-    """
-    
-    lit2clauses = defaultdict(list)
-    clause2lits = defaultdict(list)
-    
-    for clause in formula:
-        if len(clause) == 1:
-            # For unit clause, we watch the only literal
-            lit2clauses[clause.literals[0]].append(clause)
-            clause2lits[clause].append(clause.literals[0])
-        elif len(clause) > 1:
-            # For other clause, we choose any 2 literals to watch
-            lit2clauses[clause.literals[0]].append(clause)
-            lit2clauses[clause.literals[1]].append(clause)
-            clause2lits[clause].append(clause.literals[0])
-            clause2lits[clause].append(clause.literals[1])
-            
-    return lit2clauses, clause2lits
-
-
-
-def cdcl_solve(formula: Formula) -> Optional[Assignments]:
-    """
-    Solve the CNF formula.
 
-    If SAT, return the assignments.
-    If UNSAT, return None.
+def formula_clauses(formula: Union[Formula, DimacsCNF]) -> Iterator[List[int]]:
     """
-    assignments = Assignments()
-    lit2clauses, clause2lits = init_watches(formula)
-
-    # Initialize VSIDS with all variables in the formula
-    vsids = VSIDS()
-    vsids.initialize_scores(formula.variables())
-    
-    # First, do unit propagation to assign the initial unit clauses 
-    unit_clauses = [clause for clause in formula if len(clause) == 1]
-    to_propagate = []
-    for clause in unit_clauses:
-        lit = clause.literals[0]
-        var = lit.variable
-        val = not lit.negation
-        if var not in assignments:
-            assignments.assign(var, val, clause)
-            to_propagate.append(lit)
-    
-    reason, clause = unit_propagation(assignments, lit2clauses, clause2lits, to_propagate)
-    if reason == 'conflict':
-        return None
-
-    conflict_count = 0
-    decay_interval = 256 # TODO can change based on accuracy
-
-    while not all_variables_assigned(formula, assignments):
-        var, val = pick_branching_variable(formula, assignments, vsids)
-        if var is None:
-            break
-        assignments.dl += 1
-        assignments.assign(var, val, antecedent=None)
-        to_propagate = [Literal(var, not val)]
-        
-        while True:
-            reason, clause = unit_propagation(assignments, lit2clauses, clause2lits, to_propagate)
-
-            if reason != 'conflict':
-                break
-                
-            b, learnt_clause = conflict_analysis(clause, assignments)
-            if b < 0:
-                return None
-            
-            add_learnt_clause(formula, learnt_clause, assignments, lit2clauses, clause2lits, vsids)
-            backtrack(assignments, b)
-            assignments.dl = b
-
-            # The learnt clause must be a unit clause, so the
-            # next step must again be unit progagation
-            literal = next(literal for literal in learnt_clause if literal.variable not in assignments)
-            var = literal.variable
-            val = not literal.negation
-            assignments.assign(var, val, antecedent=learnt_clause)
-            to_propagate = [Literal(var, not val)]
-
-            if conflict_count % decay_interval == 0:
-                vsids.decay_scores()  # Periodically decay scores
-
-    return assignments
-
-
-
-def add_learnt_clause(formula, clause, assignments, lit2clauses, clause2lits, vsids: VSIDS):
-    formula.clauses.append(clause)
-    vsids.conflict_count += 1 # since a conflict has occurred, increase the counter in the heuristic
-    vsids.increment_score(clause) # update VSIDS scores based on the new learnt clause
-    vsids.maybe_decay_scores() # decays all scores every 256 conflicts, otherwise does nothing
-    for lit in sorted(clause, key=lambda lit: -assignments[lit.variable].dl if lit.variable in assignments else float('inf')):
-        if len(clause2lits[clause]) < 2:
-            clause2lits[clause].append(lit)
-            lit2clauses[lit].append(clause)
-        else:
-            break
-
-
-
-
-def all_variables_assigned(formula: Formula, assignments: Assignments) -> bool:
-    return len(formula.variables()) == len(assignments)
+    Yield the clauses of the formula in the integer literal encoding.
+    """
+    if isinstance(formula, DimacsCNF):
+        for clause in formula.clauses():
+            yield [(x << 1) if x > 0 else ((-x << 1) | 1) for x in clause]
+    else:
+        for clause in formula:
+            yield [(lit.variable << 1) | lit.negation for lit in clause]
 
 
 
-def pick_branching_variable(formula: Formula, assignments: Assignments, vsids: VSIDS) -> Tuple[int, bool]:
-    unassigned_vars = [var for var in formula.variables() if var not in assignments]
-    if unassigned_vars:
-        var = vsids.get_best_variable()  # Use VSIDS to get the best variable
-        val = random.choice([True, False])  # Choose a value randomly or based on some heuristic
-        return var, val
-    return None
+def num_variables(formula: Union[Formula, DimacsCNF]) -> int:
+    if isinstance(formula, DimacsCNF):
+        return formula.num_vars
+    return max(formula.variables(), default=0)
 
 
 
-def backtrack(assignments: Assignments, b: int):
-    to_remove = []
-    for var, assignment in assignments.items():
-        if assignment.dl > b:
-            to_remove.append(var)
+def formula_to_solver(formula: Union[Formula, DimacsCNF], **options) -> Solver:
+    """
+    Load the clauses of the formula into a new integer solver core, with the
+    variable arrays preallocated. options are passed on to Solver.
+    """
+    solver = Solver(num_variables(formula), **options)
+    for clause in formula_clauses(formula):
+        solver.add_clause(clause)
+    return solver
 
-    for var in to_remove:
-        assignments.pop(var)
 
 
-def clause_status(clause: Clause, assignments: Assignments) -> str:
+def cdcl_solve(formula: Union[Formula, DimacsCNF], restart_policy: Union[str, RestartPolicy] = "luby",
+               preprocess: bool = True, preprocess_limits: Optional[Dict[str, StepLimit]] = None,
+               stats: Optional[Dict[str, float]] = None, budget: Optional[Budget] = None,
+               inprocess: bool = True, local_search: Optional[str] = None, xor: bool = True,
+               symmetry: bool = True, **options) -> Union[Assignments, Unknown, None]:
     """
-    Return the status of the clause with respect to the assignments.
+    Solve the CNF formula.
 
-    There are 4 possible status of a clause:
-      1. Unit - All but one literal are assigned False
-      2. Unsatisfied - All literals are assigned False
-      3. Satisfied - All literals are assigned True
-      4. Unresolved - Neither unit, satisfied nor unsatisfied
+    If SAT, return the assignments.
+    If UNSAT, return None.
+    If the budget ran out first, return an Unknown with the reason and the
+    solver statistics.
+
+    restart_policy is "none", "luby", "glucose" or a RestartPolicy instance,
+    and options (e.g. core_lbd, max_learnt_bytes) are passed on to Solver.
+    Unless preprocess is False the clauses are simplified by a Preprocessor
+    first, with preprocess_limits overriding the budget of its steps, and
+    unless inprocess is False an Inprocessor probes and substitutes
+    equivalent literals between restarts. local_search ("probsat" or
+    "walksat") turns on the hybrid mode: bursts of local search with that
+    pick rule set the saved phases, before the search and every few
+    restarts. Unless xor is False, the XOR constraints encoded in the
+    clauses are found and solved by Gauss-Jordan elimination, which adds
+    the units and equivalences they imply and, during the search,
+    propagates them with an XorPropagator. Unless symmetry is False, the
+    symmetries of the clauses are detected and broken with lex-leader
+    clauses over new variables, which the returned assignments leave out;
+    with a seconds budget, this takes at most SYMMETRY_SHARE of it, and is
+    skipped when that is under SYMMETRY_MIN_SECONDS.
+    The formula itself is never modified; it can also be a DimacsCNF from
+    dimacs.read_dimacs.
+
+    If a stats dict is given, the seconds spent preprocessing and searching
+    and the fields of the solver's SolverStats (conflicts, decisions,
+    propagations, ...) are stored in it. Pass profile=True to also get the
+    time of each search phase, and progress_every / progress_callback to
+    follow the search while it runs. The inprocessing counters are stored
+    as a dict under "inprocess", those of local search under
+    "local_search", those of the XOR propagator under "xor" and those of
+    symmetry breaking under "symmetry".
+
+    The budget limits the whole call. Its clock, memory limit and interrupt
+    are also checked before the search starts: between the phases that
+    come before it, inside the Preprocessor and while the clauses are
+    loaded into the solver. If it runs out there, an Unknown with the
+    solver statistics so far (none before the solver exists) is returned.
     """
-    values = []
-    for literal in clause:
-        if literal.variable not in assignments:
-            values.append(None)
-        else:
-            values.append(assignments.value(literal))
-
-    if True in values:
-        return "satisfied"
-    elif values.count(False) == len(values):
-        return "unsatisfied"
-    elif values.count(False) == len(values) - 1:
-        return "unit"
+    start = time.perf_counter()
+    deadline = start + budget.seconds if budget is not None and budget.seconds is not None else None
+
+    def stop(reason: Optional[str], solver_stats: Optional[SolverStats] = None) -> Optional[Unknown]:
+        # ends the call before the search: UNSAT if reason is None, else out of budget
+        if stats is not None:
+            stats["preprocess_time"] = time.perf_counter() - start
+        return None if reason is None else Unknown(reason, solver_stats or SolverStats())
+
+    def check() -> Optional[str]:
+        return budget.check(deadline) if budget is not None else None
+
+    if inprocess and "inprocessor" not in options:
+        options["inprocessor"] = Inprocessor()
+    num_vars = num_variables(formula)
+    xors = find_xors(formula_clauses(formula), budget=budget, deadline=deadline) if xor else []
+    extra = []
+    if xors:
+        extra = gauss_preprocess(xors)
+        if extra is None:
+            return stop(None)
+    reason = check()
+    if reason is not None:
+        return stop(reason)
+    if symmetry and budget is not None and budget.seconds is not None:
+        # a small share of the budget, and none of a small one
+        symmetry = budget.seconds * SYMMETRY_SHARE >= SYMMETRY_MIN_SECONDS
+        symmetry_deadline = min(deadline, time.perf_counter() + budget.seconds * SYMMETRY_SHARE)
     else:
-        return "unresolved"
-
-
-def unit_propagation(assignments, lit2clauses, clause2lits, to_propagate: List[Literal]) -> Tuple[str, Optional[Clause]]:
-    while len(to_propagate) > 0:
-        watching_lit = to_propagate.pop().neg()
-
-        # use list(.) to copy it because size of 
-        # lit2clauses[watching_lit]might change during for-loop
-        watching_clauses = list(lit2clauses[watching_lit])
-        for watching_clause in watching_clauses:
-            for lit in watching_clause:
-                if lit in clause2lits[watching_clause]:
-                    # lit is another watching literal of watching_clause
-                    continue
-                elif lit.variable in assignments and assignments.value(lit) == False:
-                    # lit is a assigned False
-                    continue
-                else:
-                    # lit is not another watching literal of watching_clause
-                    # and is non-False literal, so we rewatch it. (case 1)
-                    clause2lits[watching_clause].remove(watching_lit)
-                    clause2lits[watching_clause].append(lit)
-                    lit2clauses[watching_lit].remove(watching_clause)
-                    lit2clauses[lit].append(watching_clause)
-                    break
-            else:
-                # we cannot find another literal to rewatch (case 2,3,4)
-                watching_lits = clause2lits[watching_clause]
-                if len(watching_lits) == 1:
-                    # watching_clause is unit clause, and the only literal
-                    # is assigned False, thus indicates a conflict
-                    return ('conflict', watching_clause)
-               	
-                # the other watching literal
-                other = watching_lits[0] if watching_lits[1] == watching_lit else watching_lits[1]
-                if other.variable not in assignments:
-                    # the other watching literal is unassigned. (case 3)
-                    assignments.assign(other.variable, not other.negation, watching_clause)
-                    to_propagate.insert(0, other)
-                elif assignments.value(other) == True:
-                    # the other watching literal is assigned True. (case 2)
-                    continue
-                else:
-                    # the other watching literal is assigned False. (case 4)
-                    return ('conflict', watching_clause)
-
-    return ('unresolved', None)
-
-
-
-def resolve(a: Clause, b: Clause, x: int) -> Clause:
-    """
-    The resolution operation
-    """
-    result = set(a.literals + b.literals) - {Literal(x, True), Literal(x, False)} # TODO this takes a while
-    result = list(result)
-    return Clause(result)
-
-
-def conflict_analysis(clause: Clause, assignments: Assignments) -> Tuple[int, Clause]:
-    if assignments.dl == 0:
-        return (-1, None)
-
-    # literals with current decision level
-    literals = [
-        literal
-        for literal in clause
-        if assignments[literal.variable].dl == assignments.dl
-    ]
-    while len(literals) != 1:
-        # implied literals
-        literals = filter(
-            lambda lit: assignments[lit.variable].antecedent != None, literals
-        )
-
-        # select any literal that meets the criterion
-        literal = next(literals)
-        antecedent = assignments[literal.variable].antecedent
-        clause = resolve(clause, antecedent, literal.variable)
-
-        # literals with current decision level
-        literals = [
-            literal
-            for literal in clause
-            if literal.variable in assignments and assignments[literal.variable].dl == assignments.dl #TODO takes time
-        ]
-
-    # out of the loop, `clause` is now the new learnt clause
-    # compute the backtrack level b (second largest decision level)
-    decision_levels = { # store decision levels of every variable in the learnt clause
-        assignments[literal.variable].dl
-        for literal in clause
-        if literal.variable in assignments # prevent keyerrors
-    }
-
-    if len(decision_levels) <= 1:
-        return 0, clause  # Less than two decision levels
+        symmetry_deadline = deadline
+    if symmetry:
+        breaking, num_vars, _, symmetry_stats = break_symmetries(num_vars, formula_clauses(formula),
+                                                                 budget=budget, deadline=symmetry_deadline)
+        extra += breaking
+        if stats is not None:
+            stats["symmetry"] = asdict(symmetry_stats)
+        reason = check()
+        if reason is not None:
+            return stop(reason)
+    if preprocess:
+        preprocessor = Preprocessor(num_vars, chain(formula_clauses(formula), extra), limits=preprocess_limits,
+                                    frozen={var for x in xors for var in x.vars}, budget=budget,
+                                    deadline=deadline)
+        if not preprocessor.run():
+            return stop(None)
+        if preprocessor.stop_reason is not None:
+            return stop(preprocessor.stop_reason)
+        clauses = preprocessor.remaining_clauses()
     else:
-        sorted_decision_levels = sorted(decision_levels, reverse=True)
-        if len(sorted_decision_levels) > 1:
-            return sorted_decision_levels[1], clause  # Access the second largest decision level
-        else:
-            return sorted_decision_levels[0], clause  # Fallback if there's only one unique decision level
+        clauses = chain(formula_clauses(formula), extra)
+    if local_search is not None:
+        clauses = list(clauses)
+        options["phase_seeder"] = PhaseSeeder(num_vars, clauses, local_search, seed=random.getrandbits(32))
+    solver = Solver(num_vars, **options)
+    for i, clause in enumerate(clauses):
+        if i % LOAD_CHECK_EVERY == 0:
+            reason = check()
+            if reason is not None:
+                return stop(reason, solver.stats())
+        solver.add_clause(clause)
+    if xors:
+        XorPropagator(xors).attach(solver)
+    if local_search is not None:
+        solver.phase_seeder.burst(solver, budget, deadline)
+    reason = check()
+    if reason is not None:
+        return stop(reason, solver.stats())
+    search_start = time.perf_counter()
+    if budget is not None and budget.seconds is not None:
+        budget = replace(budget, seconds=budget.seconds - (search_start - start))
+    satisfiable = solver.solve(restart_policy, budget=budget)
+    if stats is not None:
+        stats["preprocess_time"] = search_start - start
+        stats["search_time"] = time.perf_counter() - search_start
+        stats.update(asdict(solver.stats()))
+        if solver.inprocessor is not None:
+            stats["inprocess"] = asdict(solver.inprocessor.stats)
+        if solver.phase_seeder is not None:
+            stats["local_search"] = asdict(solver.phase_seeder.stats)
+        if solver.propagator is not None:
+            stats["xor"] = asdict(solver.propagator.stats)
+    if satisfiable is None:
+        return Unknown(solver.stop_reason, solver.stats())
+    if not satisfiable:
+        return None
+
+    model = solver.model()
+    if preprocess:
+        # give the eliminated variables values satisfying the original clauses
+        preprocessor.extend_model(model)
+    assignments = Assignments()
+    for var in formula.variables():
+        assignments[var] = Assignment(model[var], None, solver.level[var])
+    return assignments
 
 
 
@@ -352,21 +246,4 @@ def parse_dimacs_cnf(content: str) -> Formula:
     """
     parse the DIMACS cnf file format into corresponding Formula.
     """
-    clauses = [Clause([])]
-    for line in content.splitlines():
-        tokens = line.split()
-        if ((len(tokens) != 0 and tokens[0] not in ("p", "c")) and
-                (len(tokens[0]) != 0 and tokens[0][0] != "c")):
-            for tok in tokens:
-                lit = int(tok)
-                if lit == 0:
-                    clauses.append(Clause([]))
-                else:
-                    var = abs(lit)
-                    neg = lit < 0
-                    clauses[-1].literals.append(Literal(var, neg))
-
-    if len(clauses[-1]) == 0:
-        clauses.pop()
-
-    return Formula(clauses)
+    return parse_dimacs_bytes(content.encode(), strict=False).to_formula()
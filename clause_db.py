@@ -0,0 +1,108 @@
+from typing import Callable, Dict, Iterator, List
+
+
+class LearntClauseDB:
+    """
+    The learned clauses, kept apart from the clauses of the formula.
+
+    LBD and activity are stored in each clause's header in the arena; the
+    store keeps the crefs and decides when to reduce and what to delete.
+    Clauses with an LBD of at most core_lbd ("core" clauses), binary clauses
+    and clauses that are currently the reason of an assignment are never
+    deleted by a regular reduction. The words of the live learned clauses
+    are bounded by max_bytes: when they exceed it, the store is reduced
+    again, core clauses included if needed. If a reduction cannot get under
+    max_bytes (every clause left is binary or locked), the size no longer
+    forces reductions until the next regular one, so the store is not
+    reduced again on every conflict.
+    """
+
+    def __init__(self, arena, core_lbd: int = 2, max_bytes: int = 64 << 20,
+                 first_reduce: int = 2000, reduce_increment: int = 300):
+        self.arena = arena
+        self.core_lbd = core_lbd
+        self.max_bytes = max_bytes
+        self.first_reduce = first_reduce  # conflicts before the first reduction
+        self.reduce_increment = reduce_increment  # growth of the interval
+        self.next_reduce = first_reduce
+        self.crefs = []
+        self.words = 0  # arena words (headers and literals) of the stored clauses
+        self.reductions = 0
+        self.deleted = 0
+        self.over_budget = False  # the last reduction could not get under max_bytes
+
+    def __len__(self):
+        return len(self.crefs)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.crefs)
+
+    def add(self, cref: int):
+        self.crefs.append(cref)
+        self.words += self.arena.HEADER + self.arena.size(cref)
+
+    def clear(self) -> List[int]:
+        """
+        Forget every clause and return their crefs; the caller deletes them.
+        """
+        crefs = self.crefs
+        self.crefs = []
+        self.words = 0
+        self.over_budget = False
+        return crefs
+
+    def relocate(self, moved: Dict[int, int]):
+        """
+        Follow a collection of the arena, see ClauseArena.collect().
+        """
+        self.crefs = [moved[cref] for cref in self.crefs]
+
+    def bytes(self) -> int:
+        return self.words * self.arena.data.itemsize
+
+    def should_reduce(self, conflicts: int) -> bool:
+        return conflicts >= self.next_reduce or (not self.over_budget and self.bytes() > self.max_bytes)
+
+    def reduce(self, conflicts: int, locked: Callable[[int], bool]) -> List[int]:
+        """
+        Delete the worse half of the deletable clauses, ranked by LBD and then
+        by activity, and more if the store is still over its memory budget.
+        Return the deleted crefs; the caller drops their watchers.
+        """
+        arena = self.arena
+        data = arena.data
+        core_lbd = self.core_lbd
+
+        keep = []
+        candidates = []
+        for cref in self.crefs:
+            if data[cref] <= 2 or locked(cref):
+                keep.append(cref)
+            else:
+                candidates.append(cref)
+        # best first: low LBD, then high activity
+        candidates.sort(key=lambda cref: (data[cref + arena.LBD], -data[cref + arena.ACTIVITY]))
+
+        deleted = []
+        limit = len(candidates) // 2
+        while len(candidates) > limit and data[candidates[-1] + arena.LBD] > core_lbd:
+            deleted.append(candidates.pop())
+        for cref in deleted:
+            self.words -= arena.HEADER + data[cref]
+        while candidates and self.bytes() > self.max_bytes:
+            cref = candidates.pop()
+            deleted.append(cref)
+            self.words -= arena.HEADER + data[cref]
+
+        for cref in deleted:
+            arena.delete(cref)
+        # decay the activity of the survivors
+        for cref in candidates:
+            data[cref + arena.ACTIVITY] >>= 1
+
+        self.crefs = keep + candidates
+        self.reductions += 1
+        self.deleted += len(deleted)
+        self.next_reduce = conflicts + self.first_reduce + self.reductions * self.reduce_increment
+        self.over_budget = self.bytes() > self.max_bytes
+        return deleted
@@ -0,0 +1,172 @@
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+# The exchange is one shared memory block of int64 words with a ring per
+# worker. Each ring has a single writer (its worker) and is read by every
+# other worker with its own cursor, so no locks are needed: the writer fills
+# in an entry and then publishes it by storing the new head, a single aligned
+# 8-byte store. Positions are absolute word counts, the ring index is
+# position % capacity.
+#
+# ring layout: [head, exported, imported, dropped, data * capacity]
+# entry:       [seq, size, lbd, lit * size]  (lits in the solver_core encoding)
+
+HEAD = 0
+EXPORTED = 1
+IMPORTED = 2
+DROPPED = 3
+RING_HEADER = 4
+ENTRY_HEADER = 3
+
+
+class ClauseExchange:
+    """
+    Shared memory clause exchange between `workers` solver processes.
+
+    The process that creates it passes name, workers and capacity to the
+    workers, which attach with ClauseExchange(..., create=False) and take
+    their endpoint(). Call close() in every process and unlink() in the
+    creator when done.
+    """
+
+    def __init__(self, workers: int, capacity: int = 1 << 16, name: Optional[str] = None,
+                 create: bool = True):
+        self.workers = workers
+        self.capacity = capacity  # data words per ring
+        size = workers * (RING_HEADER + capacity) * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.words = self.shm.buf.cast("q")
+        if create:
+            for i in range(workers * (RING_HEADER + capacity)):
+                self.words[i] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def ring_offset(self, worker: int) -> int:
+        return worker * (RING_HEADER + self.capacity)
+
+    def endpoint(self, worker: int, max_lbd: int = 6, max_size: int = 30) -> "SharingEndpoint":
+        return SharingEndpoint(self, worker, max_lbd, max_size)
+
+    def counters(self, worker: int) -> Tuple[int, int, int]:
+        """
+        Return (exported, imported, dropped) of a worker, readable from any
+        process even after the worker exited.
+        """
+        offset = self.ring_offset(worker)
+        return (self.words[offset + EXPORTED], self.words[offset + IMPORTED], self.words[offset + DROPPED])
+
+    def close(self):
+        self.words.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class SharingEndpoint:
+    """
+    One worker's side of a ClauseExchange: export() writes to its own ring
+    and fetch() reads the clauses the other workers published since the
+    last call.
+
+    Only clauses with an LBD of at most max_lbd and at most max_size literals
+    are exported. exported, imported and dropped count clauses written,
+    clauses taken in by the solver, and clauses lost (overwritten before
+    they were read) or rejected by the solver (e.g. already satisfied).
+    """
+
+    def __init__(self, exchange: ClauseExchange, worker: int, max_lbd: int, max_size: int):
+        self.exchange = exchange
+        self.worker = worker
+        self.max_lbd = max_lbd
+        self.max_size = max_size
+        self.words = exchange.words
+        self.capacity = exchange.capacity
+        self.offset = exchange.ring_offset(worker)
+        self.seq = 0  # entries written by this worker
+        # per peer: read position and next expected seq
+        self.cursors = [exchange.words[exchange.ring_offset(peer) + HEAD] for peer in range(exchange.workers)]
+        self.expected = [0] * exchange.workers
+
+    def _count(self, counter: int, n: int = 1):
+        self.words[self.offset + counter] += n
+
+    @property
+    def exported(self) -> int:
+        return self.words[self.offset + EXPORTED]
+
+    @property
+    def imported(self) -> int:
+        return self.words[self.offset + IMPORTED]
+
+    @property
+    def dropped(self) -> int:
+        return self.words[self.offset + DROPPED]
+
+    def note_imported(self, n: int = 1):
+        self._count(IMPORTED, n)
+
+    def note_dropped(self, n: int = 1):
+        self._count(DROPPED, n)
+
+    def export(self, lits: List[int], lbd: int) -> bool:
+        """
+        Publish a learned clause if it passes the LBD and size thresholds.
+        """
+        if lbd > self.max_lbd or len(lits) > self.max_size:
+            return False
+        words = self.words
+        capacity = self.capacity
+        data = self.offset + RING_HEADER
+        head = words[self.offset + HEAD]
+        entry = [self.seq, len(lits), lbd]
+        entry.extend(lits)
+        for i, word in enumerate(entry):
+            words[data + (head + i) % capacity] = word
+        words[self.offset + HEAD] = head + len(entry)
+        self.seq += 1
+        self._count(EXPORTED)
+        return True
+
+    def fetch(self) -> List[Tuple[List[int], int]]:
+        """
+        Return the (lits, lbd) pairs published by the other workers since the
+        last call.
+        """
+        words = self.words
+        capacity = self.capacity
+        # longest entry a writer may be writing while we read
+        max_entry = ENTRY_HEADER + self.max_size
+        clauses = []
+        for peer in range(self.exchange.workers):
+            if peer == self.worker:
+                continue
+            offset = self.exchange.ring_offset(peer)
+            data = offset + RING_HEADER
+            cursor = self.cursors[peer]
+            head = words[offset + HEAD]
+            while cursor < head:
+                if head - cursor > capacity - max_entry:
+                    # the writer lapped us: skip to the head, and count what
+                    # was lost when the next entry tells its seq
+                    cursor = head
+                    break
+                seq = words[data + cursor % capacity]
+                size = words[data + (cursor + 1) % capacity]
+                lbd = words[data + (cursor + 2) % capacity]
+                lits = [words[data + (cursor + ENTRY_HEADER + i) % capacity] for i in range(size)]
+                # the entry may have been overwritten while we copied it
+                head = words[offset + HEAD]
+                if head - cursor > capacity - max_entry:
+                    cursor = head
+                    break
+                if seq > self.expected[peer]:
+                    self.note_dropped(seq - self.expected[peer])
+                self.expected[peer] = seq + 1
+                cursor += ENTRY_HEADER + size
+                clauses.append((lits, lbd))
+            self.cursors[peer] = cursor
+        return clauses
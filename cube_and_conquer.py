@@ -0,0 +1,341 @@
+import collections, math, multiprocessing, os, queue, sys, time, traceback
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Sequence, Tuple
+
+from cdcl_solver import formula_to_solver
+from dimacs import DimacsCNF, read_dimacs
+from portfolio import attach_cnf, share_cnf
+from solver_core import FALSE, NO_REASON, UNDEF, Solver, lit_to_dimacs
+
+# Cubes are lists of literals in the solver_core encoding (2*var for a
+# positive literal, 2*var+1 for a negated one).
+
+# seconds between the checks that every worker is still alive
+POLL_SECONDS = 1.0
+
+
+class LookaheadCuber:
+    """
+    Splits the search space of a solver into cubes by lookahead.
+
+    At every node the candidate variables (the unassigned ones with the
+    highest weight, where a clause of n literals adds 2^-n to each of its
+    variables) are propagated both ways, and the variable whose two sides
+    imply the most literals (the product of the two counts, as in march) is
+    branched on. A literal whose propagation fails is a failed literal: its
+    negation is added to the cube and the node is looked at again. If both
+    sides of a variable fail, the node is refuted and yields no cube.
+
+    Only the solver's assignment is used, so it can be called on a solver
+    that already searched for a while, with its learnt clauses.
+    """
+
+    def __init__(self, solver: Solver, max_depth: int = 4, candidates: int = 20):
+        self.solver = solver
+        self.max_depth = max_depth
+        self.candidates = candidates
+        self.weight = [0.0] * (solver.num_vars + 1)
+        arena = solver.arena
+        for cref in solver.clauses:
+            lits = arena.lits(cref)
+            w = 2.0 ** -len(lits)
+            for lit in lits:
+                self.weight[lit >> 1] += w
+        for a, b in solver.binary_clauses():
+            self.weight[a >> 1] += 0.25
+            self.weight[b >> 1] += 0.25
+        self.refuted = 0  # nodes refuted by lookahead
+        self.failed = 0  # failed literals found
+
+    def cubes(self, prefix: Sequence[int] = ()) -> List[List[int]]:
+        """
+        Return cubes extending prefix that together cover every model of the
+        clauses under prefix, and none if lookahead refutes them all.
+        """
+        solver = self.solver
+        solver.backtrack(0)
+        if not solver.ok or solver.propagate() != NO_REASON:
+            solver.ok = False
+            return []
+        value = solver.value
+        for lit in prefix:
+            if value[lit] == FALSE:
+                solver.backtrack(0)
+                return []
+            if value[lit] == UNDEF:
+                solver.new_decision_level()
+                solver.assign(lit, NO_REASON)
+                if solver.propagate() != NO_REASON:
+                    solver.backtrack(0)
+                    return []
+        out = []
+        self._split(list(prefix), 0, out)
+        solver.backtrack(0)
+        return out
+
+    def lookahead(self, lit: int) -> int:
+        """
+        Return the number of literals assigned by propagating lit, or -1 if
+        that leads to a conflict.
+        """
+        solver = self.solver
+        start = len(solver.trail)
+        solver.new_decision_level()
+        solver.assign(lit, NO_REASON)
+        confl = solver.propagate()
+        implied = len(solver.trail) - start
+        solver.backtrack(len(solver.trail_lim) - 1)
+        return -1 if confl != NO_REASON else implied
+
+    def _decide(self, lit: int):
+        solver = self.solver
+        solver.new_decision_level()
+        solver.assign(lit, NO_REASON)
+        solver.propagate()  # cannot fail, lookahead already propagated lit here
+
+    def _candidates(self) -> List[int]:
+        value = self.solver.value
+        weight = self.weight
+        free = [var for var in range(1, self.solver.num_vars + 1) if value[var << 1] == 0]
+        free.sort(key=lambda var: -weight[var])
+        return free[:self.candidates]
+
+    def _split(self, cube: List[int], depth: int, out: List[List[int]]):
+        solver = self.solver
+        base = len(solver.trail_lim)
+        size = len(cube)
+        try:
+            while True:
+                if depth >= self.max_depth or len(solver.trail) == solver.num_vars:
+                    out.append(list(cube))
+                    return
+                best = None
+                best_score = -1
+                forced = None
+                for var in self._candidates():
+                    pos = self.lookahead(var << 1)
+                    neg = self.lookahead((var << 1) | 1)
+                    if pos < 0 and neg < 0:
+                        self.refuted += 1
+                        return
+                    if pos < 0 or neg < 0:
+                        forced = (var << 1) | (pos < 0)
+                        break
+                    score = pos * neg + pos + neg
+                    if score > best_score:
+                        best, best_score = (var << 1) | (neg > pos), score
+                if forced is not None:
+                    self.failed += 1
+                    self._decide(forced)
+                    cube.append(forced)
+                    continue
+                if best is None:
+                    out.append(list(cube))
+                    return
+                # the side that implies more literals first
+                for lit in (best, best ^ 1):
+                    self._decide(lit)
+                    cube.append(lit)
+                    self._split(cube, depth + 1, out)
+                    cube.pop()
+                    solver.backtrack(base + len(cube) - size)
+                return
+        finally:
+            del cube[size:]
+            solver.backtrack(base)
+
+
+@dataclass
+class CubeRecord:
+    cube: List[int]
+    status: str  # "sat", "unsat", "split" (re-split after the conflict limit), "pruned" or "error"
+    seconds: float = 0.0
+    conflicts: int = 0
+
+
+@dataclass
+class CubeAndConquerResult:
+    status: str  # "sat", "unsat" or "unknown" (timeout or a cube failed)
+    model: Optional[List[bool]] = None  # value of every variable, indexed by variable
+    cubes: List[CubeRecord] = field(default_factory=list)
+    cube_time: float = 0.0  # seconds spent splitting in the main process
+    wall_time: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+def solve_cube(solver: Solver, cube: List[int], conflict_limit: Optional[int],
+               resplit_depth: int) -> Tuple[str, object, int]:
+    """
+    Solve under the cube as assumptions; the solver keeps what it learnt for
+    the next cube. Return ("sat", model, conflicts), ("unsat", refuted
+    literals of the cube, conflicts) or, when conflict_limit is hit,
+    ("split", subcubes extending cube, conflicts).
+    """
+    conflicts = solver.conflicts
+    result = solver.solve(conflict_limit=conflict_limit, assumptions=cube)
+    conflicts = solver.conflicts - conflicts
+    if result is None:
+        # the solver's learnt clauses make the lookahead sharper here
+        subcubes = LookaheadCuber(solver, resplit_depth).cubes(cube)
+        if not subcubes:
+            return "unsat", cube, conflicts
+        return "split", subcubes, conflicts
+    if result:
+        return "sat", bytes(solver.model()), conflicts
+    return "unsat", solver.failed_assumptions, conflicts
+
+
+def _worker(shm_name: str, num_vars: int, num_clauses: int, num_lits: int, tasks, results,
+            resplit_depth: int):
+    # one incremental solver per worker, shared by all the cubes it gets
+    solver = formula_to_solver(attach_cnf(shm_name, num_vars, num_clauses, num_lits))
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        cube_id, cube, conflict_limit = task
+        start = time.perf_counter()
+        try:
+            status, payload, conflicts = solve_cube(solver, cube, conflict_limit, resplit_depth)
+        except Exception:
+            status, payload, conflicts = "error", traceback.format_exc(), 0
+        results.put((cube_id, status, payload, time.perf_counter() - start, conflicts))
+
+
+def cube_and_conquer(cnf: DimacsCNF, workers: Optional[int] = None, max_depth: Optional[int] = None,
+                     conflict_limit: Optional[int] = 20000, resplit_depth: int = 2,
+                     timeout: Optional[float] = None) -> CubeAndConquerResult:
+    """
+    Split the formula into cubes with a LookaheadCuber and solve them in a
+    pool of worker processes. The formula is SAT as soon as one cube is, and
+    UNSAT once every cube is refuted.
+
+    max_depth defaults to enough splits for about four cubes per worker. A
+    cube that is not solved within conflict_limit conflicts is split again
+    by its worker, resplit_depth levels deep, and its subcubes are queued
+    with twice the limit, so that cubes which do not get easier by splitting
+    are eventually solved outright.
+    A refuted cube is reduced to the cube literals its refutation needed
+    (the failed assumptions), and cubes that contain those literals are
+    pruned before being dispatched.
+    """
+    start = time.time()
+    workers = workers or os.cpu_count() or 1
+    if max_depth is None:
+        max_depth = max(1, math.ceil(math.log2(4 * workers)))
+    result = CubeAndConquerResult("unknown")
+
+    solver = formula_to_solver(cnf)
+    cube_start = time.perf_counter()
+    # (cube, conflict limit) pairs
+    pending: Deque[Tuple[List[int], Optional[int]]] = collections.deque(
+        (cube, conflict_limit) for cube in LookaheadCuber(solver, max_depth).cubes())
+    result.cube_time = time.perf_counter() - cube_start
+    if not pending:
+        result.status = "unsat"
+        result.wall_time = time.time() - start
+        return result
+
+    ctx = multiprocessing.get_context()
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    shm = share_cnf(cnf)
+    processes = []
+    try:
+        for _ in range(workers):
+            p = ctx.Process(target=_worker, daemon=True,
+                            args=(shm.name, cnf.num_vars, cnf.num_clauses, len(cnf.lits), tasks, results,
+                                  resplit_depth))
+            p.start()
+            processes.append(p)
+
+        refuted: List[frozenset] = []
+        running = {}  # cube id -> (cube, conflict limit)
+        next_id = 0
+        while pending or running:
+            # keep the queue short, so that cubes are pruned with the latest refutations
+            while pending and len(running) < 2 * workers:
+                cube, limit = pending.popleft()
+                cube_set = frozenset(cube)
+                if any(r <= cube_set for r in refuted):
+                    result.cubes.append(CubeRecord(cube, "pruned"))
+                    continue
+                running[next_id] = (cube, limit)
+                tasks.put((next_id, cube, limit))
+                next_id += 1
+            if not running:
+                continue
+
+            wait = POLL_SECONDS if timeout is None else min(POLL_SECONDS, timeout - (time.time() - start))
+            if wait <= 0:
+                break
+            try:
+                cube_id, status, payload, seconds, conflicts = results.get(timeout=wait)
+            except queue.Empty:
+                # a killed worker (e.g. by the OOM killer) never answers for
+                # the cube it took; the cube cannot be told apart from the
+                # queued ones, so give up rather than wait forever
+                dead = [p for p in processes if not p.is_alive()]
+                if dead:
+                    result.errors.append(f"worker exited with code {dead[0].exitcode} while cubes were open")
+                    break
+                continue
+            cube, limit = running.pop(cube_id)
+            result.cubes.append(CubeRecord(cube, status, seconds, conflicts))
+            if status == "sat":
+                result.status = "sat"
+                result.model = [bool(value) for value in payload]
+                break
+            if status == "unsat":
+                if not payload:
+                    # refuted without any cube literal: the formula is UNSAT
+                    result.status = "unsat"
+                    break
+                refuted.append(frozenset(payload))
+            elif status == "split":
+                pending.extend((subcube, 2 * limit) for subcube in payload)
+            else:
+                result.errors.append(f"cube {[lit_to_dimacs(lit) for lit in cube]}: {payload}")
+        else:
+            if not result.errors:
+                result.status = "unsat"
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+        for p in processes:
+            p.join()
+        tasks.close()
+        results.close()
+        shm.close()
+        shm.unlink()
+
+    result.wall_time = time.time() - start
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3, 4):
+        print("Usage: python cube_and_conquer.py <path to file> [workers] [timeout in seconds]")
+        sys.exit(1)
+
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    timeout = float(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    cnf = read_dimacs(sys.argv[1])
+    result = cube_and_conquer(cnf, workers, timeout=timeout)
+
+    for error in result.errors:
+        print(error, file=sys.stderr)
+    if result.status == "sat":
+        assert cnf.satisfied_by(result.model)
+    print(result.status)
+    if result.status == "sat":
+        for var in cnf.variables():
+            print(str(var) + " := " + str(result.model[var]).lower())
+    for record in result.cubes:
+        cube = " ".join(str(lit_to_dimacs(lit)) for lit in record.cube)
+        print(f"cube [{cube}] {record.status} in {record.seconds:.3f} seconds, {record.conflicts} conflicts")
+    print(f"Cubes: {len(result.cubes)}, split by lookahead in {result.cube_time:.6f} seconds")
+    print(f"Parse time: {cnf.parse_time:.6f} seconds")
+    print(f"Execution time: {result.wall_time:.6f} seconds")
@@ -0,0 +1,225 @@
+import bz2, gzip, lzma, mmap, os, time
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+# magic bytes of the compressed formats we can stream from
+COMPRESSED = (
+    (b"\x1f\x8b", gzip.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+    (b"BZh", bz2.open),
+)
+
+CHUNK_SIZE = 1 << 20
+
+# the literal array is preallocated for this many words per clause of the
+# header (three literals and the 0, exact for 3-SAT), but never more than
+# PREALLOCATE_MAX words, so a wrong header cannot make it allocate too much
+WORDS_PER_CLAUSE = 4
+PREALLOCATE_MAX = 1 << 24
+
+
+class DimacsError(ValueError):
+    pass
+
+
+@dataclass
+class DimacsCNF:
+    """
+    A parsed DIMACS CNF file.
+
+    lits holds the clauses as DIMACS integers, each clause terminated by a
+    0, in one compact int array: 4 bytes per literal.
+    """
+    num_vars: int
+    num_clauses: int
+    lits: array
+    parse_time: float = 0.0  # seconds spent reading and parsing
+
+    def clauses(self) -> Iterator[array]:
+        """
+        Iterate over the clauses as arrays of DIMACS integers.
+        """
+        lits = self.lits
+        start = 0
+        n = len(lits)
+        while start < n:
+            end = lits.index(0, start)
+            yield lits[start:end]
+            start = end + 1
+
+    def variables(self) -> List[int]:
+        """
+        Return the variables that occur in the clauses, in increasing order.
+        """
+        occurs = bytearray(self.num_vars + 1)
+        for x in self.lits:
+            occurs[x if x > 0 else -x] = 1
+        occurs[0] = 0
+        return [var for var in range(1, self.num_vars + 1) if occurs[var]]
+
+    def satisfied_by(self, model: Sequence[bool]) -> bool:
+        """
+        Check a model given as the value of every variable, indexed by
+        variable.
+        """
+        satisfied = False
+        for x in self.lits:
+            if x == 0:
+                if not satisfied:
+                    return False
+                satisfied = False
+            elif not satisfied:
+                satisfied = model[x] if x > 0 else not model[-x]
+        return True
+
+    def to_formula(self):
+        """
+        Convert to a common_classes.Formula, for the original solver.
+        """
+        from common_classes import Literal, Clause, Formula
+        return Formula([Clause([Literal(abs(x), x < 0) for x in clause]) for clause in self.clauses()])
+
+
+def _parse_header(line: bytes) -> List[int]:
+    tokens = line.split()
+    if len(tokens) != 4 or tokens[1] != b"cnf":
+        raise DimacsError(f"invalid header line: {line.decode(errors='replace')!r}")
+    try:
+        num_vars, num_clauses = int(tokens[2]), int(tokens[3])
+    except ValueError:
+        raise DimacsError(f"invalid header line: {line.decode(errors='replace')!r}") from None
+    if num_vars < 0 or num_clauses < 0:
+        raise DimacsError(f"invalid header line: {line.decode(errors='replace')!r}")
+    return [num_vars, num_clauses]
+
+
+def parse_dimacs_chunks(chunks: Iterable[bytes], strict: bool = True) -> DimacsCNF:
+    """
+    Parse DIMACS CNF given as consecutive chunks of bytes.
+
+    Comment lines ("c ...") are skipped and a line starting with "%" ends the
+    formula, as in the SATLIB benchmarks. In strict mode the "p cnf" header is
+    required and the variable and clause counts must match it; otherwise the
+    counts are taken from the clauses.
+    """
+    start_time = time.perf_counter()
+    lits = array("i")
+    size = 0  # literals parsed, lits[size:] is preallocated space
+    header = None
+    rest = b""
+    for chunk in chunks:
+        block = rest + chunk
+        cut = block.rfind(b"\n") + 1
+        rest = block[cut:]
+        seen = header
+        header, done, part = _parse_block(block[:cut], header)
+        if seen is None and header is not None and size == 0:
+            # sized from the header, so the array is not regrown as it fills
+            lits = array("i", bytes(lits.itemsize * min(WORDS_PER_CLAUSE * header[1], PREALLOCATE_MAX)))
+        size = _store(lits, size, part)
+        if done:
+            rest = b""
+            break
+    if rest:
+        header, _, part = _parse_block(rest, header)
+        size = _store(lits, size, part)
+    del lits[size:]
+
+    if len(lits) > 0 and lits[-1] != 0:
+        lits.append(0)  # the last clause may lack its terminating 0
+
+    num_clauses = lits.count(0)
+    max_var = max(max(lits, default=0), -min(lits, default=0))
+    if header is None:
+        if strict:
+            raise DimacsError("missing 'p cnf' header")
+        header = [max_var, num_clauses]
+    elif strict:
+        if max_var > header[0]:
+            raise DimacsError(f"variable {max_var} exceeds the {header[0]} variables declared in the header")
+        if num_clauses != header[1]:
+            raise DimacsError(f"found {num_clauses} clauses but the header declares {header[1]}")
+    return DimacsCNF(max(header[0], max_var), num_clauses, lits, time.perf_counter() - start_time)
+
+
+def _store(lits: array, size: int, part: array) -> int:
+    """
+    Write part into lits at size, into the preallocated space while it
+    lasts, and return the new size.
+    """
+    end = size + len(part)
+    if end <= len(lits):
+        lits[size:end] = part
+    else:
+        del lits[size:]
+        lits.extend(part)
+    return end
+
+
+def _parse_block(block: bytes, header: Optional[List[int]]):
+    """
+    Parse a block of whole lines. Return the header (if seen so far),
+    whether a "%" line ended the formula and the literals of the block.
+    """
+    # fast path: only clause lines
+    if b"c" not in block and b"p" not in block and b"%" not in block:
+        try:
+            return header, False, array("i", map(int, block.split()))
+        except ValueError as e:
+            raise DimacsError(f"invalid literal: {e}") from None
+
+    body = []
+    done = False
+    for line in block.split(b"\n"):
+        line = line.strip()
+        if not line or line[0] == ord("c"):
+            continue
+        if line[0] == ord("p"):
+            if header is not None:
+                raise DimacsError("duplicate 'p cnf' header")
+            header = _parse_header(line)
+        elif line[0] == ord("%"):
+            done = True
+            break
+        else:
+            body.append(line)
+    try:
+        return header, done, array("i", map(int, b" ".join(body).split()))
+    except ValueError as e:
+        raise DimacsError(f"invalid literal: {e}") from None
+
+
+def read_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the contents of a file in chunks: gzip, xz and bzip2 files are
+    decompressed as a stream, and plain files are memory-mapped.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(6)
+    for signature, opener in COMPRESSED:
+        if magic.startswith(signature):
+            with opener(path, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+    size = os.path.getsize(path)
+    if size == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        for start in range(0, size, chunk_size):
+            yield m[start:start + chunk_size]
+
+
+def read_dimacs(path: str, strict: bool = True) -> DimacsCNF:
+    """
+    Read a DIMACS CNF file, possibly compressed with gzip, xz or bzip2.
+    """
+    return parse_dimacs_chunks(read_chunks(path), strict)
+
+
+def parse_dimacs_bytes(content: bytes, strict: bool = True) -> DimacsCNF:
+    return parse_dimacs_chunks([content], strict)
@@ -0,0 +1,203 @@
+import time
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional
+
+from solver_core import BINARY, NO_REASON, UNDEF, Solver
+
+# Runs on the integer literals of solver_core (2*var for a positive literal,
+# 2*var+1 for a negated one), directly on a Solver at decision level 0.
+
+
+@dataclass
+class InprocessStats:
+    rounds: int = 0
+    seconds: float = 0.0
+    probes: int = 0  # literals probed
+    failed_literals: int = 0  # probes that conflicted
+    necessary_assignments: int = 0  # implied by both signs of a probed variable
+    substituted: int = 0  # variables replaced by an equivalent literal
+
+
+class Inprocessor:
+    """
+    Simplification between restarts, at decision level 0:
+
+      probe      - failed-literal probing: assign a literal at a new decision
+                   level and propagate. If that conflicts, its negation holds
+                   at level 0; otherwise the literals implied by both signs
+                   of the variable hold at level 0.
+      substitute - equivalent-literal substitution: the strongly connected
+                   components of the binary implication graph are classes of
+                   equivalent literals, and each class is replaced by one
+                   representative literal with Solver.simplify().
+
+    A round runs every `every` restarts. Probing is limited to `effort`
+    literals propagated per round and resumes where the previous round
+    stopped; finding the components is linear in the binary clauses. The
+    solver records the substitutions, so its models stay models of the
+    clauses it was given, and frozen variables are never substituted.
+    """
+
+    def __init__(self, every: int = 5, effort: int = 100_000):
+        self.every = every
+        self.effort = effort
+        self.restarts = 0
+        self.last_var = 0  # the next probing round starts after it
+        self.stats = InprocessStats()
+
+    def on_restart(self, solver: Solver) -> bool:
+        """
+        Called by the solver after each restart. Return False if a round
+        found the clauses unsatisfiable.
+        """
+        self.restarts += 1
+        if self.restarts % self.every:
+            return True
+        return self.run(solver)
+
+    def run(self, solver: Solver) -> bool:
+        """
+        One round: probe, then substitute equivalent literals. Return False
+        if the clauses are unsatisfiable.
+        """
+        start = time.perf_counter()
+        stats = self.stats
+        stats.rounds += 1
+        solver.backtrack(0)
+        units = len(solver.trail)
+        if solver.propagate() != NO_REASON:
+            solver.ok = False
+        elif self.probe(solver):
+            substitute = self.equivalent_literals(solver)
+            if substitute is not None or len(solver.trail) > units:
+                solver.simplify(substitute)
+        stats.seconds += time.perf_counter() - start
+        return solver.ok
+
+    def probe(self, solver: Solver) -> bool:
+        """
+        Probe both signs of the variables in binary clauses, starting after
+        last_var, until the effort is spent. Return False if the clauses are
+        unsatisfiable.
+        """
+        stats = self.stats
+        value = solver.value
+        watches = solver.watches
+        trail = solver.trail
+        # probing would overwrite the saved phases of everything it assigns
+        saved_phase = array('b', solver.saved_phase)
+        limit = solver.propagations + self.effort
+        num_vars = solver.num_vars
+        var = self.last_var
+        for _ in range(num_vars):
+            if solver.propagations >= limit:
+                break
+            var = var % num_vars + 1
+            lit = var << 1
+            if value[lit] != UNDEF or BINARY not in watches[lit][::2] and BINARY not in watches[lit | 1][::2]:
+                continue
+            implied = []
+            for probe in (lit, lit | 1):
+                stats.probes += 1
+                solver.new_decision_level()
+                solver.assign(probe, NO_REASON)
+                failed = solver.propagate() != NO_REASON
+                implied.append(trail[solver.trail_lim[0] + 1:])
+                solver.backtrack(0)
+                if failed:
+                    stats.failed_literals += 1
+                    solver.assign(probe ^ 1, NO_REASON)
+                    if solver.propagate() != NO_REASON:
+                        solver.ok = False
+                        return False
+                    break
+            else:
+                necessary = set(implied[0]).intersection(implied[1])
+                for q in necessary:
+                    if value[q] == UNDEF:
+                        stats.necessary_assignments += 1
+                        solver.assign(q, NO_REASON)
+                if necessary and solver.propagate() != NO_REASON:
+                    solver.ok = False
+                    return False
+        self.last_var = var
+        solver.saved_phase[:] = saved_phase
+        return True
+
+    def equivalent_literals(self, solver: Solver) -> Optional[List[int]]:
+        """
+        Find the strongly connected components of the binary implication
+        graph over the unassigned literals (Tarjan's algorithm, iterative).
+        Return a substitution for Solver.simplify() mapping every literal of
+        a component to its representative, or None if there are no
+        equivalences. A component holding both signs of a variable makes the
+        clauses unsatisfiable; then solver.ok is cleared and None returned.
+
+        The representative is the frozen variable of the component if there
+        is one, else the one with the smallest index, so the component of
+        the negated literals gets the negated representative.
+        """
+        value = solver.value
+        frozen = solver.frozen
+        implications = solver.binary_implications
+        size = 2 * solver.num_vars + 2
+        index = [0] * size  # visit order, counted from 1; 0 if not visited
+        low = [0] * size
+        on_stack = bytearray(size)
+        stack = []
+        substitute = None
+        counter = 0
+        for root in range(2, size):
+            if index[root] or value[root] != UNDEF:
+                continue
+            counter += 1
+            index[root] = low[root] = counter
+            stack.append(root)
+            on_stack[root] = 1
+            work = [(root, iter(implications(root)))]
+            while work:
+                v, successors = work[-1]
+                for w in successors:
+                    if value[w] != UNDEF:
+                        continue
+                    if not index[w]:
+                        counter += 1
+                        index[w] = low[w] = counter
+                        stack.append(w)
+                        on_stack[w] = 1
+                        work.append((w, iter(implications(w))))
+                        break
+                    if on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                else:
+                    work.pop()
+                    if work and low[v] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[v]
+                    if low[v] != index[v]:
+                        continue
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        component.append(w)
+                        if w == v:
+                            break
+                    if len(component) == 1:
+                        continue
+                    members = set(component)
+                    if any(lit ^ 1 in members for lit in component):
+                        solver.ok = False
+                        return None
+                    pinned = [lit for lit in component if frozen[lit >> 1]]
+                    rep = min(pinned or component, key=lambda lit: lit >> 1)
+                    if substitute is None:
+                        substitute = list(range(size))
+                    for lit in component:
+                        if lit != rep and not frozen[lit >> 1]:
+                            substitute[lit] = rep
+                            substitute[lit ^ 1] = rep ^ 1
+        if substitute is not None:
+            # count variables, the negated literals are substituted too
+            self.stats.substituted += sum(substitute[lit] != lit for lit in range(2, size, 2))
+        return substitute
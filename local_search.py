@@ -0,0 +1,284 @@
+import random, time
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from budget import Budget
+
+# Clauses are handled in the integer literal encoding of solver_core
+# (2*var for a positive literal, 2*var+1 for a negated one).
+
+PICK_RULES = ("probsat", "walksat")
+
+# flips between the checks of the budget
+CHECK_EVERY = 4096
+
+# a burst of PhaseSeeder makes at most this many flips per clause
+FLIPS_PER_CLAUSE = 10
+
+
+@dataclass
+class LocalSearchStats:
+    bursts: int = 0
+    flips: int = 0
+    best_unsat: int = -1  # fewest unsatisfied clauses seen, -1 before any search
+    seconds: float = 0.0
+
+
+class LocalSearch:
+    """
+    Stochastic local search over a complete assignment.
+
+    Every clause keeps the number of its true literals and the XOR of them,
+    which is its only true literal when the count is 1. From these, the
+    break count of each variable (clauses that flipping it would falsify)
+    is updated on every flip, and the unsatisfied clauses are kept in a
+    list with each clause's position in it, so adding and removing one is
+    O(1). A flip costs O(occurrences of the variable). Both pick rules
+    score by break count alone, so no make counts are kept.
+
+    A step picks a random unsatisfied clause and a variable in it to flip:
+
+      probsat - with probability proportional to (eps + break) ** -cb
+      walksat - a variable with break 0 if there is one, otherwise with
+                probability noise a random one, else one with the least
+                break (SKC)
+    """
+
+    def __init__(self, num_vars: int, clauses: Iterable[Sequence[int]], rule: str = "probsat",
+                 seed: Optional[int] = None, cb: Optional[float] = None, eps: float = 1.0,
+                 noise: float = 0.567):
+        if rule not in PICK_RULES:
+            raise ValueError(f"unknown pick rule {rule!r}, expected one of {', '.join(PICK_RULES)}")
+        self.num_vars = num_vars
+        self.rule = rule
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.clauses = []
+        self.has_empty = False  # an empty clause can never be satisfied
+        self.occs = [[] for _ in range(2 * num_vars + 2)]  # literal -> clause ids
+        for clause in clauses:
+            lits = list(dict.fromkeys(clause))
+            if not lits:
+                self.has_empty = True
+                continue
+            if any(lit ^ 1 in lits for lit in lits):
+                continue  # a tautology is always satisfied
+            for lit in lits:
+                self.occs[lit].append(len(self.clauses))
+            self.clauses.append(lits)
+        if cb is None:
+            # the probSAT paper's polynomial setting for the clause length
+            longest = max(map(len, self.clauses), default=3)
+            cb = 2.38 if longest <= 3 else 3.0 if longest == 4 else 3.7
+        most = max(map(len, self.occs), default=0)
+        # (eps + break) ** -cb for every possible break count
+        self.probability = [(eps + b) ** -cb for b in range(most + 1)]
+
+        num_clauses = len(self.clauses)
+        self.value = bytearray(num_vars + 1)  # 1 if the variable is true
+        self.true_count = array('i', [0]) * num_clauses
+        self.true_xor = array('i', [0]) * num_clauses
+        self.break_count = array('i', [0]) * (num_vars + 1)
+        self.unsat = []  # clause ids
+        self.where = array('i', [-1]) * num_clauses  # clause id -> position in unsat, or -1
+        self.best_value = bytearray(num_vars + 1)
+        self.best_unsat = num_clauses + 1
+        self.stats = LocalSearchStats()
+        self.reset()
+
+    def reset(self, phases: Optional[Sequence[bool]] = None):
+        """
+        Start from the given value of every variable (indexed by variable),
+        or a random assignment, and recompute all counts.
+        """
+        rng = self.rng
+        value = self.value
+        for var in range(1, self.num_vars + 1):
+            value[var] = (phases[var] if phases is not None else rng.getrandbits(1)) and 1
+        true_count = self.true_count
+        true_xor = self.true_xor
+        break_count = self.break_count
+        where = self.where
+        unsat = self.unsat = []
+        for var in range(self.num_vars + 1):
+            break_count[var] = 0
+        for cid, lits in enumerate(self.clauses):
+            count = xor = 0
+            for lit in lits:
+                if value[lit >> 1] != lit & 1:
+                    count += 1
+                    xor ^= lit
+            true_count[cid] = count
+            true_xor[cid] = xor
+            if count == 0:
+                where[cid] = len(unsat)
+                unsat.append(cid)
+            else:
+                where[cid] = -1
+                if count == 1:
+                    break_count[xor >> 1] += 1
+        self.best_unsat = len(self.clauses) + 1
+        self._note_best()
+
+    def _note_best(self):
+        if len(self.unsat) < self.best_unsat:
+            self.best_unsat = len(self.unsat)
+            self.best_value[:] = self.value
+
+    def flip(self, var: int):
+        value = self.value
+        value[var] ^= 1
+        true_lit = (var << 1) | (value[var] ^ 1)
+        false_lit = true_lit ^ 1
+        true_count = self.true_count
+        true_xor = self.true_xor
+        break_count = self.break_count
+        unsat = self.unsat
+        where = self.where
+
+        for cid in self.occs[true_lit]:
+            count = true_count[cid] + 1
+            true_count[cid] = count
+            if count == 1:
+                # satisfied now, by var alone
+                last = unsat.pop()
+                if last != cid:
+                    unsat[where[cid]] = last
+                    where[last] = where[cid]
+                where[cid] = -1
+                break_count[var] += 1
+                true_xor[cid] = true_lit
+            else:
+                if count == 2:
+                    # the previously critical literal has company now
+                    break_count[true_xor[cid] >> 1] -= 1
+                true_xor[cid] ^= true_lit
+
+        for cid in self.occs[false_lit]:
+            count = true_count[cid] - 1
+            true_count[cid] = count
+            xor = true_xor[cid] ^ false_lit
+            true_xor[cid] = xor
+            if count == 0:
+                where[cid] = len(unsat)
+                unsat.append(cid)
+                break_count[var] -= 1
+            elif count == 1:
+                break_count[xor >> 1] += 1
+
+    def pick(self) -> int:
+        """
+        Choose the variable to flip next, per the pick rule.
+        """
+        rng = self.rng
+        lits = self.clauses[self.unsat[rng.randrange(len(self.unsat))]]
+        break_count = self.break_count
+        if self.rule == "probsat":
+            probability = self.probability
+            weights = [probability[break_count[lit >> 1]] for lit in lits]
+            r = rng.random() * sum(weights)
+            for lit, weight in zip(lits, weights):
+                r -= weight
+                if r <= 0:
+                    return lit >> 1
+            return lits[-1] >> 1
+        least = min(break_count[lit >> 1] for lit in lits)
+        if least > 0 and rng.random() < self.noise:
+            return rng.choice(lits) >> 1
+        return rng.choice([lit for lit in lits if break_count[lit >> 1] == least]) >> 1
+
+    def run(self, max_flips: int, budget: Optional[Budget] = None, deadline: Optional[float] = None) -> bool:
+        """
+        Flip until every clause is satisfied, max_flips flips are done or
+        the budget runs out; its counters of conflicts and propagations do
+        not apply. The clock runs until deadline (a time.perf_counter()
+        value) if given, else for budget.seconds from now. Return True if
+        the assignment is a model. The assignment with the fewest
+        unsatisfied clauses is kept in best_value either way.
+        """
+        if self.has_empty:
+            return False
+        start = time.perf_counter()
+        if deadline is None and budget is not None and budget.seconds is not None:
+            deadline = start + budget.seconds
+        stats = self.stats
+        stats.bursts += 1
+        unsat = self.unsat
+        pick = self.pick
+        flip = self.flip
+        flips = 0
+        while unsat and flips < max_flips:
+            flip(pick())
+            flips += 1
+            if len(unsat) < self.best_unsat:
+                self._note_best()
+            if budget is not None and flips % CHECK_EVERY == 0 and budget.check(deadline) is not None:
+                break
+        stats.flips += flips
+        stats.seconds += time.perf_counter() - start
+        if stats.best_unsat < 0 or self.best_unsat < stats.best_unsat:
+            stats.best_unsat = self.best_unsat
+        return not unsat
+
+    def model(self) -> List[bool]:
+        """
+        The best assignment found, indexed by variable.
+        """
+        return [bool(v) for v in self.best_value]
+
+
+class PhaseSeeder:
+    """
+    Hybrid local search and CDCL: a burst of local search every `every`
+    restarts of the CDCL solver, started from its saved phases, writes the
+    best assignment it finds back into the saved phases. When the burst
+    finds a model, the next decisions follow it without a conflict. The
+    first burst makes flips flips, but at most FLIPS_PER_CLAUSE per clause,
+    so it is short on small formulas; each burst that lowers the fewest
+    unsatisfied clauses seen doubles the length of the next, up to that
+    cap.
+    """
+
+    def __init__(self, num_vars: int, clauses: Iterable[Sequence[int]], rule: str = "probsat",
+                 every: int = 10, flips: int = 20_000, seed: Optional[int] = None):
+        self.search = LocalSearch(num_vars, clauses, rule, seed)
+        self.every = every
+        self.max_flips = max(FLIPS_PER_CLAUSE * len(self.search.clauses), 1)
+        self.flips = min(flips, self.max_flips)  # of the next burst
+        self.restarts = 0
+
+    @property
+    def stats(self) -> LocalSearchStats:
+        return self.search.stats
+
+    def on_restart(self, solver):
+        self.restarts += 1
+        if self.restarts % self.every == 0:
+            self.burst(solver)
+
+    def burst(self, solver, budget: Optional[Budget] = None, deadline: Optional[float] = None):
+        """
+        One burst from the solver's saved phases (0 is positive, 1 negative),
+        or from a random assignment the first time, when no phases are saved
+        yet. The burst stops early when the budget runs out, by default the
+        one of the solver's running solve(), so that a deadline or an
+        interrupt is not held up by a long burst.
+        """
+        if budget is None:
+            budget, deadline = solver.budget, solver.deadline
+        search = self.search
+        num_vars = search.num_vars
+        saved_phase = solver.saved_phase
+        if search.stats.bursts == 0:
+            search.reset()
+        else:
+            search.reset([False] + [saved_phase[var] == 0 for var in range(1, num_vars + 1)])
+        best_unsat = search.stats.best_unsat
+        search.run(self.flips, budget, deadline)
+        if 0 <= search.stats.best_unsat < best_unsat:
+            # longer bursts while they get closer to a model
+            self.flips = min(2 * self.flips, self.max_flips)
+        best = search.best_value
+        for var in range(1, num_vars + 1):
+            saved_phase[var] = best[var] ^ 1
@@ -1,28 +1,57 @@
 import sys
 import random
 import time
+from functools import partial
 
 if __name__ == "__main__":
     # you might comment it to get inconsistent execution time
     random.seed(5201314)
 
-    if len(sys.argv) != 3:
-        print("Provide one DIMACS cnf filename as argument as well as 'original' or 'vsids' to indicate the solver")
+    options = sys.argv[3:]
+    if len(sys.argv) < 3 or any(option != "--stats" and not option.startswith("--cache=") for option in options):
+        print("Provide one DIMACS cnf filename as argument as well as 'original', 'vsids', 'hybrid' or 'portfolio' to indicate the solver")
+        print("Options: --stats, --cache=DIR to reuse the results of earlier runs kept in DIR")
+        sys.exit(1)
+    show_stats = "--stats" in options
+    cache_dir = next((option[len("--cache="):] for option in options if option.startswith("--cache=")), None)
+    if show_stats and sys.argv[1] not in ('vsids', 'hybrid'):
+        print("--stats is only available for the vsids and hybrid solvers")
         sys.exit(1)
 
     if sys.argv[1] == 'original':
         from cdcl_solver_original import parse_dimacs_cnf, cdcl_solve
+        read_formula = lambda path: parse_dimacs_cnf(open(path).read())
     elif sys.argv[1] == 'vsids':
-        from cdcl_solver import parse_dimacs_cnf, cdcl_solve
+        from cdcl_solver import cdcl_solve
+        from dimacs import read_dimacs as read_formula
+    elif sys.argv[1] == 'hybrid':
+        from cdcl_solver import cdcl_solve
+        from dimacs import read_dimacs as read_formula
+        # vsids with bursts of probSAT local search setting the saved phases
+        cdcl_solve = partial(cdcl_solve, local_search="probsat")
+    elif sys.argv[1] == 'portfolio':
+        from portfolio import cdcl_solve
+        from dimacs import read_dimacs as read_formula
     else:
         print("The solver you want to use was indicated incorrectly")
         sys.exit(1)
 
+    if cache_dir:
+        from result_cache import ResultCache
+        # renamed, differently numbered copies of a formula share an entry
+        cache = ResultCache(cache_dir, rename=True)
+        cdcl_solve = partial(cache.solve, solve=cdcl_solve)
+
     start_time = time.time()
 
-    dimacs_cnf = open(sys.argv[2]).read()
-    formula = parse_dimacs_cnf(dimacs_cnf)
-    result = cdcl_solve(formula)
+    formula = read_formula(sys.argv[2])
+    parse_time = time.time() - start_time
+    if show_stats:
+        # a progress line every 10000 conflicts and the time of each phase
+        stats = {}
+        result = cdcl_solve(formula, stats=stats, profile=True, progress_every=10000)
+    else:
+        result = cdcl_solve(formula)
 
     total_time = time.time() - start_time
 
@@ -35,4 +64,34 @@ if __name__ == "__main__":
     else:
         print("unsat")
 
+    if show_stats:
+        from dataclasses import fields
+        from stats import SolverStats, format_stats
+        # no search statistics when preprocessing alone refuted the formula
+        print(format_stats(SolverStats(**{f.name: stats[f.name] for f in fields(SolverStats) if f.name in stats})))
+        if "inprocess" in stats:
+            inprocess = stats["inprocess"]
+            print(f"Inprocessing: {inprocess['rounds']} rounds in {inprocess['seconds']:.6f} seconds, "
+                  f"{inprocess['failed_literals']} failed literals, "
+                  f"{inprocess['necessary_assignments']} necessary assignments, "
+                  f"{inprocess['substituted']} variables substituted")
+        if "local_search" in stats:
+            local_search = stats["local_search"]
+            print(f"Local search: {local_search['bursts']} bursts, {local_search['flips']} flips in "
+                  f"{local_search['seconds']:.6f} seconds, fewest unsatisfied clauses {local_search['best_unsat']}")
+        if "symmetry" in stats:
+            symmetry = stats["symmetry"]
+            print(f"Symmetry: {symmetry['generators']} generators moving {symmetry['support']} variables in "
+                  f"{symmetry['seconds']:.6f} seconds{'' if symmetry['complete'] else ' (effort limit reached)'}, "
+                  f"{symmetry['clauses']} symmetry-breaking clauses")
+        if "xor" in stats:
+            xor = stats["xor"]
+            print(f"XOR: {xor['xors']} constraints over {xor['columns']} variables, "
+                  f"{xor['eliminations']} eliminations in {xor['seconds']:.6f} seconds, "
+                  f"{xor['implied']} implied, {xor['conflicts']} conflicts"
+                  f"{' (turned off)' if xor['disabled'] else ''}")
+    if show_stats and cache_dir:
+        print(f"Cache: {cache.stats.hits} hits, {cache.stats.misses} misses, {cache.stats.stores} stored, "
+              f"{cache.stats.evictions} evicted, {cache.stats.rejected} rejected")
+    print(f"Parse time: {parse_time:.6f} seconds")
     print(f"Execution time: {total_time:.6f} seconds")  # Print the execution time
\ No newline at end of file
@@ -0,0 +1,245 @@
+import multiprocessing, os, queue, random, sys, time, traceback
+from array import array
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, Union
+from clause_sharing import ClauseExchange
+from common_classes import Formula, Assignment
+from dimacs import DimacsCNF, read_dimacs
+
+
+@dataclass
+class PortfolioConfig:
+    """
+    Settings of one portfolio worker. solver is "vsids" (cdcl_solver) or
+    "original" (cdcl_solver_original); the other fields only apply to vsids.
+    """
+    name: str
+    solver: str = "vsids"
+    seed: int = 5201314
+    polarity: str = "saved"
+    var_decay: float = 0.95
+    restart_policy: str = "luby"
+    preprocess: bool = True
+    local_search: Optional[str] = None  # pick rule of the hybrid mode, see local_search.py
+
+
+# diversified settings, used in this order
+DEFAULT_CONFIGS = [
+    PortfolioConfig("default"),
+    PortfolioConfig("target-glucose", polarity="target", restart_policy="glucose"),
+    PortfolioConfig("best-fast-decay", polarity="best", var_decay=0.90),
+    PortfolioConfig("probsat-hybrid", local_search="probsat"),
+    PortfolioConfig("random-phase", seed=1, polarity="random"),
+    PortfolioConfig("glucose-slow-decay", restart_policy="glucose", var_decay=0.99),
+    PortfolioConfig("false-no-preprocess", polarity="false", preprocess=False),
+    PortfolioConfig("true-glucose", polarity="true", restart_policy="glucose", var_decay=0.85),
+    PortfolioConfig("original", solver="original"),
+]
+
+
+def default_configs(workers: int) -> List[PortfolioConfig]:
+    """
+    Return workers configurations: the defaults first, then random-phase
+    workers that differ only in their seed.
+    """
+    configs = DEFAULT_CONFIGS[:workers]
+    for i in range(len(configs), workers):
+        configs.append(PortfolioConfig(f"random-phase-{i}", seed=i, polarity="random"))
+    return configs
+
+
+@dataclass
+class PortfolioResult:
+    status: str  # "sat", "unsat" or "unknown" (timeout or every worker failed)
+    model: Optional[List[bool]] = None  # value of every variable, indexed by variable
+    winner: Optional[PortfolioConfig] = None
+    wall_time: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    # worker name -> (clauses exported, imported, dropped), with clause sharing
+    sharing: Dict[str, Tuple[int, int, int]] = field(default_factory=dict)
+
+
+def share_cnf(cnf: DimacsCNF) -> shared_memory.SharedMemory:
+    """
+    Copy the literals of the formula into a new shared memory block.
+    """
+    data = cnf.lits.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    shm.buf[:len(data)] = data
+    return shm
+
+
+def attach_cnf(shm_name: str, num_vars: int, num_clauses: int, num_lits: int) -> DimacsCNF:
+    """
+    Rebuild the formula shipped by share_cnf in a worker process.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        lits = array("i")
+        lits.frombytes(shm.buf[:num_lits * lits.itemsize])
+    finally:
+        shm.close()
+    return DimacsCNF(num_vars, num_clauses, lits)
+
+
+def _worker(index: int, config: PortfolioConfig, shm_name: str, num_vars: int, num_clauses: int,
+            num_lits: int, results, exchange_name: Optional[str], workers: int, exchange_capacity: int):
+    exchange = None
+    try:
+        cnf = attach_cnf(shm_name, num_vars, num_clauses, num_lits)
+        random.seed(config.seed)
+        if config.solver == "original":
+            from cdcl_solver_original import cdcl_solve
+            formula = cnf.to_formula()
+            assignments = cdcl_solve(formula)
+        else:
+            from cdcl_solver import cdcl_solve
+            sharing = None
+            if exchange_name is not None:
+                exchange = ClauseExchange(workers, exchange_capacity, exchange_name, create=False)
+                sharing = exchange.endpoint(index)
+            assignments = cdcl_solve(cnf, config.restart_policy, preprocess=config.preprocess,
+                                     polarity=config.polarity, var_decay=config.var_decay, sharing=sharing,
+                                     local_search=config.local_search)
+        if assignments is None:
+            results.put((index, "unsat", None))
+        else:
+            model = bytearray(num_vars + 1)
+            for var, assignment in assignments.items():
+                model[var] = assignment.value
+            results.put((index, "sat", bytes(model)))
+    except Exception:
+        results.put((index, "error", traceback.format_exc()))
+    finally:
+        if exchange is not None:
+            exchange.close()
+
+
+def portfolio_solve(cnf: DimacsCNF, workers: Optional[int] = None,
+                    configs: Optional[List[PortfolioConfig]] = None,
+                    timeout: Optional[float] = None, share_clauses: bool = True,
+                    exchange_capacity: int = 1 << 16) -> PortfolioResult:
+    """
+    Run diversified solvers on the formula in parallel processes and return
+    the first answer; the remaining workers are terminated.
+
+    The literals are put into shared memory once and every worker copies
+    them from there, instead of receiving a pickled copy. With share_clauses
+    the vsids workers also exchange short learned clauses through a
+    ClauseExchange of exchange_capacity words per worker.
+    """
+    start = time.time()
+    if configs is None:
+        configs = default_configs(workers or os.cpu_count() or 1)
+
+    ctx = multiprocessing.get_context()
+    results = ctx.Queue()
+    shm = share_cnf(cnf)
+    exchange = ClauseExchange(len(configs), exchange_capacity) if share_clauses else None
+    exchange_name = exchange.name if exchange is not None else None
+    processes = []
+    result = PortfolioResult("unknown")
+    try:
+        for index, config in enumerate(configs):
+            p = ctx.Process(target=_worker, daemon=True,
+                            args=(index, config, shm.name, cnf.num_vars, cnf.num_clauses, len(cnf.lits), results,
+                                  exchange_name, len(configs), exchange_capacity))
+            p.start()
+            processes.append(p)
+
+        pending = len(processes)
+        while pending > 0:
+            wait = None if timeout is None else timeout - (time.time() - start)
+            if wait is not None and wait <= 0:
+                break
+            try:
+                index, status, payload = results.get(timeout=wait)
+            except queue.Empty:
+                break
+            pending -= 1
+            if status == "error":
+                result.errors.append(f"{configs[index].name}: {payload}")
+                continue
+            result.status = status
+            result.winner = configs[index]
+            if status == "sat":
+                result.model = [bool(value) for value in payload]
+            break
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+        for p in processes:
+            p.join()
+        results.close()
+        shm.close()
+        shm.unlink()
+        if exchange is not None:
+            for index, config in enumerate(configs):
+                if config.solver != "original":
+                    result.sharing[config.name] = exchange.counters(index)
+            exchange.close()
+            exchange.unlink()
+
+    result.wall_time = time.time() - start
+    return result
+
+
+def cdcl_solve(formula: Union[Formula, DimacsCNF], workers: Optional[int] = None,
+               timeout: Optional[float] = None):
+    """
+    Same interface as cdcl_solver.cdcl_solve, solved by a portfolio.
+
+    Raise TimeoutError if no worker answered in time and RuntimeError if
+    every worker failed.
+    """
+    from cdcl_solver import Assignments
+
+    cnf = formula
+    if not isinstance(formula, DimacsCNF):
+        lits = array("i")
+        for clause in formula:
+            lits.extend(-lit.variable if lit.negation else lit.variable for lit in clause)
+            lits.append(0)
+        cnf = DimacsCNF(max(formula.variables(), default=0), len(formula), lits)
+
+    result = portfolio_solve(cnf, workers, timeout=timeout)
+    if result.status == "unknown":
+        if result.errors:
+            raise RuntimeError("every portfolio worker failed:\n" + "\n".join(result.errors))
+        raise TimeoutError("no portfolio worker answered in time")
+    if result.status == "unsat":
+        return None
+
+    assignments = Assignments()
+    for var in formula.variables():
+        assignments[var] = Assignment(result.model[var], None, 0)
+    return assignments
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3, 4):
+        print("Usage: python portfolio.py <path to file> [workers] [timeout in seconds]")
+        sys.exit(1)
+
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    timeout = float(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    cnf = read_dimacs(sys.argv[1])
+    result = portfolio_solve(cnf, workers, timeout=timeout)
+
+    for error in result.errors:
+        print(error, file=sys.stderr)
+    if result.status == "sat":
+        assert cnf.satisfied_by(result.model)
+    print(result.status)
+    if result.status == "sat":
+        for var in cnf.variables():
+            print(str(var) + " := " + str(result.model[var]).lower())
+    if result.winner is not None:
+        print(f"Winner: {result.winner.name}")
+    for name, (exported, imported, dropped) in result.sharing.items():
+        print(f"Clauses shared by {name}: {exported} exported, {imported} imported, {dropped} dropped")
+    print(f"Parse time: {cnf.parse_time:.6f} seconds")
+    print(f"Execution time: {result.wall_time:.6f} seconds")
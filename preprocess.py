@@ -0,0 +1,338 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from budget import Budget
+
+# Clauses are handled in the integer literal encoding of solver_core
+# (2*var for a positive literal, 2*var+1 for a negated one).
+
+
+@dataclass
+class StepLimit:
+    """
+    Budget of one preprocessing step: wall-clock seconds and effort, counted
+    in clauses visited.
+    """
+    seconds: float = 1.0
+    effort: int = 2_000_000
+
+
+@dataclass
+class StepStats:
+    seconds: float = 0.0
+    effort: int = 0
+    clauses_removed: int = 0
+    literals_removed: int = 0
+    vars_eliminated: int = 0
+    completed: bool = False  # False if the step ran out of budget
+
+
+DEFAULT_LIMITS = {
+    "cleanup": StepLimit(1.0, 10_000_000),
+    "subsume": StepLimit(1.0, 2_000_000),
+    "strengthen": StepLimit(1.0, 2_000_000),
+    "eliminate": StepLimit(2.0, 2_000_000),
+}
+
+
+class _Budget:
+    """
+    Tracks the effort of a running step and checks the clock, and the
+    budget of the whole solve if given, every CHECK_EVERY effort units.
+    """
+
+    CHECK_EVERY = 4096
+
+    def __init__(self, limit: StepLimit, stats: StepStats, budget: Optional[Budget] = None,
+                 deadline: Optional[float] = None):
+        self.limit = limit
+        self.stats = stats
+        self.budget = budget
+        self.deadline = deadline
+        self.start = time.perf_counter()
+        self.next_check = self.CHECK_EVERY
+        self.out = False
+        self.reason = None  # why the budget of the solve ran out
+
+    def spend(self, effort: int) -> bool:
+        """
+        Add effort and return True once the step is out of budget.
+        """
+        stats = self.stats
+        stats.effort += effort
+        if stats.effort >= self.next_check:
+            self.next_check = stats.effort + self.CHECK_EVERY
+            if (stats.effort > self.limit.effort or
+                    time.perf_counter() - self.start > self.limit.seconds):
+                self.out = True
+            elif self.budget is not None:
+                self.reason = self.budget.check(self.deadline)
+                self.out = self.reason is not None
+        return self.out
+
+    def done(self):
+        self.stats.seconds += time.perf_counter() - self.start
+        self.stats.completed = not self.out
+
+
+class Preprocessor:
+    """
+    SatELite-style preprocessing on occurrence lists:
+
+      cleanup    - drop tautologies and duplicate clauses
+      subsume    - delete clauses subsumed by another clause (backward
+                   subsumption from every clause)
+      strengthen - self-subsuming resolution: if C \\ {l} is a subset of D and
+                   D contains ¬l, remove ¬l from D
+      eliminate  - bounded variable elimination: replace the clauses of a
+                   variable by their non-tautological resolvents when that
+                   does not increase the number of clauses
+
+    Every step has its own StepLimit. Eliminated clauses are pushed on a
+    reconstruction stack, and extend_model() turns a model of the remaining
+    clauses into a model of the original ones. Frozen variables are never
+    eliminated.
+
+    A budget (with deadline, a time.perf_counter() value, as its clock)
+    limits the whole preprocessing on top of the step limits: once
+    budget.check() fires, while the clauses are loaded or in any step,
+    stop_reason is set to its reason and nothing more is done.
+    """
+
+    CHECK_EVERY = 4096  # clauses loaded between the checks of the budget
+
+    def __init__(self, num_vars: int, clauses: Iterable[List[int]], frozen: Iterable[int] = (),
+                 limits: Optional[Dict[str, StepLimit]] = None, max_resolvent_size: int = 20,
+                 budget: Optional[Budget] = None, deadline: Optional[float] = None):
+        self.num_vars = num_vars
+        self.budget = budget
+        self.deadline = deadline
+        self.stop_reason = None
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_resolvent_size = max_resolvent_size
+        self.frozen = bytearray(num_vars + 1)
+        for var in frozen:
+            self.frozen[var] = 1
+        self.clauses = []  # clause id -> set of literals, None once deleted
+        self.occs = [set() for _ in range(2 * num_vars + 2)]  # literal -> clause ids
+        self.stack = []  # (literal, clause) pairs for model reconstruction
+        self.eliminated = bytearray(num_vars + 1)
+        self.stats = {step: StepStats() for step in self.limits}
+        self.ok = True  # False once the empty clause is derived
+        for i, clause in enumerate(clauses):
+            if budget is not None and i % self.CHECK_EVERY == 0:
+                self.stop_reason = budget.check(deadline)
+                if self.stop_reason is not None:
+                    break
+            self._add(set(clause))
+
+    def _add(self, clause: Set[int]) -> int:
+        if not clause:
+            self.ok = False
+        cid = len(self.clauses)
+        self.clauses.append(clause)
+        for lit in clause:
+            self.occs[lit].add(cid)
+        return cid
+
+    def _delete(self, cid: int):
+        for lit in self.clauses[cid]:
+            self.occs[lit].discard(cid)
+        self.clauses[cid] = None
+
+    def _remove_literal(self, cid: int, lit: int):
+        self.clauses[cid].discard(lit)
+        self.occs[lit].discard(cid)
+        if not self.clauses[cid]:
+            self.ok = False
+
+    def _live(self) -> List[int]:
+        return [cid for cid, clause in enumerate(self.clauses) if clause is not None]
+
+    def _budget(self, step: str) -> _Budget:
+        return _Budget(self.limits[step], self.stats[step], self.budget, self.deadline)
+
+    def _finish(self, budget: _Budget):
+        budget.done()
+        if budget.reason is not None:
+            self.stop_reason = budget.reason
+
+    def run(self) -> bool:
+        """
+        Run all steps in order. Return False if the clauses are unsatisfiable.
+        """
+        for step in (self.cleanup, self.subsume, self.strengthen, self.eliminate):
+            if not self.ok or self.stop_reason is not None:
+                break
+            step()
+        return self.ok
+
+    def cleanup(self):
+        stats = self.stats["cleanup"]
+        budget = self._budget("cleanup")
+        known = set()
+        for cid in self._live():
+            if budget.spend(1):
+                break
+            clause = self.clauses[cid]
+            key = frozenset(clause)
+            if key in known or any(lit ^ 1 in clause for lit in clause):
+                stats.clauses_removed += 1
+                self._delete(cid)
+            else:
+                known.add(key)
+        self._finish(budget)
+
+    def _subsume_with(self, cid: int, budget: _Budget, stats: StepStats):
+        """
+        Delete the clauses that clause cid subsumes.
+        """
+        clause = self.clauses[cid]
+        occs = self.occs
+        lit = min(clause, key=lambda lit: len(occs[lit]))
+        budget.spend(len(occs[lit]))
+        for other in list(occs[lit]):
+            if other != cid:
+                d = self.clauses[other]
+                if len(d) >= len(clause) and clause <= d:
+                    self._delete(other)
+                    stats.clauses_removed += 1
+
+    def _subsumed(self, clause: Set[int], cid: int, budget: _Budget) -> bool:
+        """
+        Forward subsumption: whether another clause is a subset of clause.
+        """
+        for lit in clause:
+            budget.spend(len(self.occs[lit]))
+            for other in self.occs[lit]:
+                if other != cid:
+                    d = self.clauses[other]
+                    if len(d) <= len(clause) and d <= clause:
+                        return True
+        return False
+
+    def subsume(self):
+        stats = self.stats["subsume"]
+        budget = self._budget("subsume")
+        # short clauses subsume the most, so try them first
+        for cid in sorted(self._live(), key=lambda cid: len(self.clauses[cid])):
+            if budget.out:
+                break
+            if self.clauses[cid] is not None:
+                self._subsume_with(cid, budget, stats)
+        self._finish(budget)
+
+    def strengthen(self):
+        stats = self.stats["strengthen"]
+        budget = self._budget("strengthen")
+        queue = sorted(self._live(), key=lambda cid: -len(self.clauses[cid]))
+        queued = set(queue)
+        while queue and self.ok and not budget.out:
+            cid = queue.pop()
+            queued.discard(cid)
+            clause = self.clauses[cid]
+            if clause is None:
+                continue
+            for lit in list(clause):
+                if self.clauses[cid] is None:
+                    break
+                rest = clause - {lit}
+                neg = lit ^ 1
+                budget.spend(len(self.occs[neg]))
+                for other in list(self.occs[neg]):
+                    d = self.clauses[other]
+                    if d is None or len(d) < len(clause) or not rest <= d:
+                        continue
+                    self._remove_literal(other, neg)
+                    stats.literals_removed += 1
+                    if not self.ok:
+                        break
+                    if self._subsumed(d, other, budget):
+                        self._delete(other)
+                        stats.clauses_removed += 1
+                    else:
+                        # the shorter clause may strengthen or subsume others now
+                        self._subsume_with(other, budget, stats)
+                        if other not in queued:
+                            queue.append(other)
+                            queued.add(other)
+                if not self.ok:
+                    break
+        self._finish(budget)
+
+    def _resolvents(self, var: int, budget: _Budget) -> Optional[List[Set[int]]]:
+        """
+        Return the non-tautological resolvents on var, or None if there are
+        more than the clauses they would replace or one is too long.
+        """
+        pos_lit = var << 1
+        pos = [self.clauses[cid] for cid in self.occs[pos_lit]]
+        neg = [self.clauses[cid] for cid in self.occs[pos_lit | 1]]
+        bound = len(pos) + len(neg)
+        resolvents = []
+        budget.spend(len(pos) * len(neg))
+        for c in pos:
+            for d in neg:
+                if any(lit ^ 1 in c for lit in d if lit != pos_lit | 1):
+                    continue  # tautology
+                resolvent = (c | d) - {pos_lit, pos_lit | 1}
+                if len(resolvent) > self.max_resolvent_size:
+                    return None
+                resolvents.append(resolvent)
+                if len(resolvents) > bound:
+                    return None
+        return resolvents
+
+    def eliminate(self):
+        stats = self.stats["eliminate"]
+        budget = self._budget("eliminate")
+        occs = self.occs
+        # variables with few occurrences are the cheapest to eliminate
+        candidates = sorted(
+            (var for var in range(1, self.num_vars + 1) if not self.frozen[var]),
+            key=lambda var: len(occs[var << 1]) * len(occs[(var << 1) | 1]))
+        for var in candidates:
+            if budget.out or not self.ok:
+                break
+            pos_lit = var << 1
+            if not occs[pos_lit] and not occs[pos_lit | 1]:
+                continue
+            resolvents = self._resolvents(var, budget)
+            if resolvents is None:
+                continue
+
+            # keep the clauses of var for model reconstruction, with the
+            # polarity that has fewer clauses; its reversal is sound either way
+            lit = pos_lit if len(occs[pos_lit]) <= len(occs[pos_lit | 1]) else pos_lit | 1
+            for cid in list(occs[lit]):
+                self.stack.append((lit, tuple(self.clauses[cid])))
+            self.stack.append((lit ^ 1, (lit ^ 1,)))
+            for cid in list(occs[pos_lit]) + list(occs[pos_lit | 1]):
+                self._delete(cid)
+                stats.clauses_removed += 1
+            self.eliminated[var] = 1
+            stats.vars_eliminated += 1
+
+            for resolvent in resolvents:
+                if self._subsumed(resolvent, -1, budget):
+                    continue
+                cid = self._add(resolvent)
+                stats.clauses_removed -= 1
+                if not self.ok:
+                    break
+                self._subsume_with(cid, budget, stats)
+        self._finish(budget)
+
+    def remaining_clauses(self) -> List[List[int]]:
+        return [sorted(clause) for clause in self.clauses if clause is not None]
+
+    def extend_model(self, model: List[bool]) -> List[bool]:
+        """
+        Extend a model of the remaining clauses (the value of every variable,
+        indexed by variable) to the eliminated variables, in place.
+        """
+        for lit, clause in reversed(self.stack):
+            if not any(model[l >> 1] != bool(l & 1) for l in clause):
+                model[lit >> 1] = not (lit & 1)
+        return model
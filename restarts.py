@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+from typing import Union
+
+
+@dataclass
+class RestartRecord:
+    """
+    Statistics of one restart interval, recorded when the restart happens.
+    """
+    conflicts: int  # conflicts since the previous restart
+    decisions: int  # decisions since the previous restart
+    mean_lbd: float  # average LBD of the clauses learned in the interval
+    kept_level: int  # decision level the trail was kept down to
+
+
+def luby(y: float, x: int) -> float:
+    """
+    Return the x-th element (from 0) of the Luby sequence scaled by y, i.e.
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ... for y = 2.
+    """
+    # find the finite subsequence that contains index x, and its size
+    size, seq = 1, 0
+    while size < x + 1:
+        seq += 1
+        size = 2 * size + 1
+
+    while size - 1 != x:
+        size = (size - 1) >> 1
+        seq -= 1
+        x = x % size
+
+    return y ** seq
+
+
+class RestartPolicy:
+    """
+    Decides when the search restarts. The solver reports every conflict with
+    the LBD of the clause it learned, asks should_restart() before each
+    decision and calls on_restart() when it restarts.
+    """
+
+    name = "none"
+
+    def on_conflict(self, lbd: int):
+        pass
+
+    def should_restart(self) -> bool:
+        return False
+
+    def on_restart(self):
+        pass
+
+
+class NoRestarts(RestartPolicy):
+    pass
+
+
+class LubyRestarts(RestartPolicy):
+    """
+    Restart after unit * luby(2, i) conflicts in the i-th interval.
+    """
+
+    name = "luby"
+
+    def __init__(self, unit: int = 100, factor: float = 2):
+        self.unit = unit
+        self.factor = factor
+        self.restarts = 0
+        self.conflicts = 0
+        self.limit = unit * luby(factor, 0)
+
+    def on_conflict(self, lbd: int):
+        self.conflicts += 1
+
+    def should_restart(self) -> bool:
+        return self.conflicts >= self.limit
+
+    def on_restart(self):
+        self.restarts += 1
+        self.conflicts = 0
+        self.limit = self.unit * luby(self.factor, self.restarts)
+
+
+class EMA:
+    """
+    Exponential moving average with bias correction, so that it is usable
+    from the first sample on even for a small alpha.
+    """
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.biased = 0.0
+        self.exp = 1.0
+        self.value = 0.0
+
+    def update(self, x: float):
+        self.biased += self.alpha * (x - self.biased)
+        self.exp *= 1 - self.alpha
+        self.value = self.biased / (1 - self.exp)
+
+
+class GlucoseRestarts(RestartPolicy):
+    """
+    Glucose-style dynamic restarts: restart when the recent (fast) average
+    LBD of learned clauses exceeds the long-term (slow) average by a margin,
+    i.e. when the clauses learned lately are worse than usual.
+    """
+
+    name = "glucose"
+
+    def __init__(self, fast_alpha: float = 0.03, slow_alpha: float = 1e-5,
+                 margin: float = 1.1, min_conflicts: int = 2):
+        self.fast = EMA(fast_alpha)
+        self.slow = EMA(slow_alpha)
+        self.margin = margin
+        self.min_conflicts = min_conflicts  # conflicts between two restarts
+        self.conflicts = 0
+
+    def on_conflict(self, lbd: int):
+        self.conflicts += 1
+        self.fast.update(lbd)
+        self.slow.update(lbd)
+
+    def should_restart(self) -> bool:
+        return (self.conflicts >= self.min_conflicts and
+                self.fast.value > self.margin * self.slow.value)
+
+    def on_restart(self):
+        self.conflicts = 0
+
+
+RESTART_POLICIES = {
+    "none": NoRestarts,
+    "luby": LubyRestarts,
+    "glucose": GlucoseRestarts,
+}
+
+
+def make_restart_policy(policy: Union[str, RestartPolicy]) -> RestartPolicy:
+    """
+    Return a restart policy from its name, or the policy itself.
+    """
+    if isinstance(policy, RestartPolicy):
+        return policy
+    if policy not in RESTART_POLICIES:
+        raise ValueError(f"unknown restart policy {policy!r}, expected one of {', '.join(RESTART_POLICIES)}")
+    return RESTART_POLICIES[policy]()
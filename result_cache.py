@@ -0,0 +1,274 @@
+import hashlib, json, os, sys, tempfile, time
+from array import array
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from budget import Unknown
+from cdcl_solver import Assignments, cdcl_solve, formula_clauses
+from common_classes import Formula, Assignment
+from dimacs import DimacsCNF
+from symmetry import DEFAULT_EFFORT, SymmetryFinder
+
+# bump when the canonical form or the entry format changes
+CACHE_VERSION = 1
+
+# temporary files older than this were left behind by a crashed writer
+STALE_SECONDS = 3600
+
+
+@dataclass
+class CanonicalCNF:
+    """
+    A formula in canonical form: the literals of every clause sorted by
+    variable, then sign, without duplicates; no tautologies; the clauses
+    sorted and without duplicates. With renaming, the variables are
+    numbered 1..n in an order that depends only on the clauses.
+    """
+    clauses: List[Tuple[int, ...]]  # of the canonical variables, in solver_core's literal encoding
+    num_vars: int
+    to_canonical: Dict[int, int]  # variable of the formula -> canonical variable
+    renamed: bool
+    digest: str  # SHA-256 of the canonical clauses, hex
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    rejected: int = 0  # damaged entries and stored models that did not satisfy the formula
+
+
+def _normalize(clauses: Iterable[Sequence[int]]) -> List[Tuple[int, ...]]:
+    """
+    Sort the literals of every clause and the clauses, dropping duplicates
+    and tautologies. Literals are in the encoding of solver_core, so sorting
+    them sorts by variable, then sign, and the two literals of a variable
+    end up next to each other.
+    """
+    normalized = set()
+    for clause in clauses:
+        lits = sorted(set(clause))
+        if any(a ^ b == 1 for a, b in zip(lits, lits[1:])):
+            continue  # a tautology
+        normalized.add(tuple(lits))
+    return sorted(normalized)
+
+
+def canonical_cnf(formula: Union[Formula, DimacsCNF], rename: bool = False,
+                  effort: int = DEFAULT_EFFORT) -> CanonicalCNF:
+    """
+    Bring the formula into canonical form, so that formulas that differ only
+    in the order of their clauses and of the literals in them, or in
+    duplicate literals and clauses, get the same digest.
+
+    With rename, the variables are renamed too: the clause-literal graph of
+    symmetry.SymmetryFinder, with the positive and negative literals in
+    different colours, is refined into a discrete partition and the
+    variables numbered in the order of their positive literals in it. When
+    colour refinement alone makes the partition discrete (for most
+    formulas without symmetries), formulas that are the same up to a
+    renaming of the variables get the same digest. Otherwise, or if the
+    effort runs out, the digest is still deterministic but may differ
+    between renamed copies, which only costs a cache miss.
+    """
+    clauses = _normalize(formula_clauses(formula))
+    used = sorted({lit >> 1 for clause in clauses for lit in clause})
+    order = used
+    renamed = False
+    if rename and used:
+        compact = [0] * (used[-1] + 1)
+        for i, var in enumerate(used):
+            compact[var] = i + 1
+        finder = SymmetryFinder(len(used), ([(compact[lit >> 1] << 1) | (lit & 1) for lit in clause]
+                                            for clause in clauses), effort, signed=True)
+        labelling = finder.labelling()
+        if labelling is not None:
+            # literal vertex v is literal v + 2, of variable (v >> 1) + 1
+            order = [used[v >> 1] for v in labelling if not v & 1]
+            renamed = True
+    if renamed:
+        to_canonical = {var: i for i, var in enumerate(order, 1)}
+        clauses = _normalize([(to_canonical[lit >> 1] << 1) | (lit & 1) for lit in clause] for clause in clauses)
+    else:
+        to_canonical = {var: var for var in used}
+
+    digest = hashlib.sha256()
+    digest.update(f"cnf-v{CACHE_VERSION} renamed={int(renamed)}\n".encode())
+    data = array("i")
+    for clause in clauses:
+        data.extend([-(lit >> 1) if lit & 1 else lit >> 1 for lit in clause])
+        data.append(0)
+    if sys.byteorder == "big":
+        data.byteswap()
+    digest.update(data.tobytes())
+    num_vars = len(order) if renamed else max(used, default=0)
+    return CanonicalCNF(clauses, num_vars, to_canonical, renamed, digest.hexdigest())
+
+
+class ResultCache:
+    """
+    Verdicts and models of solved formulas in a directory, one JSON file per
+    formula named by the digest of its canonical form (see canonical_cnf).
+
+    Entries are written to a temporary file in the same directory and moved
+    into place with os.replace(), so readers in other processes see either
+    no entry or a complete one. A hit updates the entry's modification
+    time, and after every store the least recently used entries are
+    deleted until the cache holds at most max_entries entries and
+    max_bytes bytes. Two processes evicting at once can only delete an
+    entry twice, which is ignored.
+
+    A stored model is checked against the formula before it is returned;
+    if it does not satisfy it (a damaged or foreign file), the entry is
+    deleted and the lookup counts as a miss. UNSAT verdicts cannot be
+    checked this way and are trusted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 << 20, max_entries: int = 10_000,
+                 rename: bool = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.rename = rename
+        self.stats = CacheStats()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest + ".json")
+
+    def get(self, formula: Union[Formula, DimacsCNF],
+            canonical: Optional[CanonicalCNF] = None) -> Optional[Dict]:
+        """
+        Look the formula up. Return None on a miss, else a dict with the
+        status ("sat" or "unsat") and, if SAT, the model as a dict from the
+        formula's variables to their values.
+        """
+        canonical = canonical or canonical_cnf(formula, self.rename)
+        path = self._path(canonical.digest)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except OSError:
+            self.stats.misses += 1
+            return None
+        except ValueError:
+            entry = None
+        if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION \
+                or entry.get("status") not in ("sat", "unsat"):
+            self._reject(path)
+            return None
+        if entry["status"] == "unsat":
+            self.stats.hits += 1
+            return {"status": "unsat"}
+        bits = entry.get("model")
+        if not isinstance(bits, str):
+            bits = ""
+        model = {var: 0 < c <= len(bits) and bits[c - 1] == "1"
+                 for var, c in canonical.to_canonical.items()}
+        for var in formula.variables():
+            model.setdefault(var, False)
+        if not all(any(model.get(lit >> 1, False) != lit & 1 for lit in clause)
+                   for clause in formula_clauses(formula)):
+            self._reject(path)
+            return None
+        self.stats.hits += 1
+        return {"status": "sat", "model": model}
+
+    def _reject(self, path: str):
+        self.stats.rejected += 1
+        self.stats.misses += 1
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def put(self, formula: Union[Formula, DimacsCNF], model: Optional[Dict[int, bool]],
+            canonical: Optional[CanonicalCNF] = None):
+        """
+        Store the verdict for the formula: SAT with the model (a dict from
+        variables to values), or UNSAT if model is None.
+        """
+        canonical = canonical or canonical_cnf(formula, self.rename)
+        entry = {"version": CACHE_VERSION, "status": "unsat" if model is None else "sat",
+                 "num_vars": canonical.num_vars, "created": time.time()}
+        if model is not None:
+            bits = ["0"] * canonical.num_vars
+            for var, c in canonical.to_canonical.items():
+                if model.get(var, False):
+                    bits[c - 1] = "1"
+            entry["model"] = "".join(bits)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self._path(canonical.digest))
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self.stats.stores += 1
+        self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache is within its
+        limits, and temporary files left behind by crashed writers.
+        """
+        entries = []
+        now = time.time()
+        with os.scandir(self.directory) as it:
+            for e in it:
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue  # deleted meanwhile
+                if e.name.startswith(".tmp-"):
+                    if now - st.st_mtime > STALE_SECONDS:
+                        self._unlink(e.path)
+                elif e.name.endswith(".json"):
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        count = len(entries)
+        for _, size, path in entries:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            if self._unlink(path):
+                self.stats.evictions += 1
+            count -= 1
+            total -= size
+
+    @staticmethod
+    def _unlink(path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    def solve(self, formula: Union[Formula, DimacsCNF], solve: Optional[Callable] = None, **options):
+        """
+        Same interface as cdcl_solver.cdcl_solve: answer from the cache, or
+        solve the formula with solve (cdcl_solve by default, called with the
+        options) and store a definite answer.
+        """
+        canonical = canonical_cnf(formula, self.rename)
+        entry = self.get(formula, canonical)
+        if entry is not None:
+            if entry["status"] == "unsat":
+                return None
+            assignments = Assignments()
+            for var in formula.variables():
+                assignments[var] = Assignment(entry["model"][var], None, 0)
+            return assignments
+        result = (solve or cdcl_solve)(formula, **options)
+        if result is None:
+            self.put(formula, None, canonical)
+        elif not isinstance(result, Unknown):
+            self.put(formula, {var: a.value for var, a in result.items()}, canonical)
+        return result
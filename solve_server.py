@@ -0,0 +1,429 @@
+import asyncio, collections, multiprocessing, os, signal, sys, time, traceback
+from dataclasses import asdict, dataclass, field
+from typing import Deque, Dict, List, Optional, Set
+
+# imported before the workers are forked, so they start with the solver loaded
+from budget import Budget, Unknown
+from cdcl_solver import cdcl_solve
+from dimacs import parse_dimacs_bytes
+
+# A line-based protocol; every line ends with "\n".
+#
+#   client: SOLVE [conflicts=N] [propagations=N] [seconds=S] [memory_mb=M] [progress=N]
+#           <DIMACS lines>
+#           END
+#   server: QUEUED <job>
+#           PROGRESS <job> seconds=S conflicts=N decisions=N propagations=N restarts=N learnts=N
+#                                               (every N conflicts, with progress=N)
+#           RESULT <job> sat seconds=S          followed by MODEL <job> <DIMACS literals> 0
+#           RESULT <job> unsat seconds=S
+#           RESULT <job> unknown seconds=S reason=<conflicts|propagations|seconds|memory|interrupted>
+#           ERROR <job> <message>               (a bad formula or a crashed worker)
+#
+#   client: CANCEL <job>   server: RESULT <job> unknown ... reason=interrupted, once the job stops
+#                          (only jobs submitted on the same connection)
+#   client: STATS          server: STATS workers=N queued=N running=N done=N
+#                                  latency_p50=S latency_p90=S latency_p99=S wait_p50=S wait_p99=S
+#   client: QUIT           the server closes the connection once the client's jobs are over
+#
+# A malformed command gets "ERROR - <message>". Every SOLVE gets one QUEUED
+# line and then, once the job is over, one RESULT or ERROR line; jobs are
+# numbered by the server, in the order they are received. Seconds in
+# RESULT are the solve time in the worker, latencies are measured from
+# the END line to the result and waits from the END line to the start of
+# the solve. The budget and CANCEL apply to the whole solve in the worker,
+# from the parsing on, not only to the search.
+
+BUDGET_FIELDS = {"conflicts": int, "propagations": int, "seconds": float, "memory_mb": float}
+
+# results the latency percentiles are computed over
+LATENCY_WINDOW = 10_000
+
+# longest line of a request, DIMACS lines included
+MAX_LINE = 1 << 20
+
+
+@dataclass
+class Job:
+    id: int
+    dimacs: bytes
+    budget: Dict[str, float]  # Budget fields
+    progress_every: int
+    writer: asyncio.StreamWriter
+    submitted: float
+    started: Optional[float] = None
+    worker: Optional["Worker"] = None
+    cancelled: bool = False
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+@dataclass
+class ServerStats:
+    workers: int = 0
+    queued: int = 0
+    running: int = 0
+    done: int = 0
+    latency_p50: float = 0.0
+    latency_p90: float = 0.0
+    latency_p99: float = 0.0
+    wait_p50: float = 0.0
+    wait_p99: float = 0.0
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    The nearest-rank p-th percentile of sorted values, 0 if there are none.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _solve_job(conn, job_id: int, dimacs: bytes, budget: Dict[str, float], progress_every: int,
+               interrupt) -> Optional[str]:
+    def progress(stats):
+        conn.send(("progress", job_id, (stats.seconds, stats.conflicts, stats.decisions,
+                                        stats.propagations, stats.restarts, stats.learnts_kept)))
+
+    start = time.perf_counter()
+    cnf = parse_dimacs_bytes(dimacs)
+    limits = Budget(interrupt=interrupt, **budget)
+    if limits.seconds is not None:
+        # the job's clock started before the parsing
+        limits.seconds -= time.perf_counter() - start
+    result = cdcl_solve(cnf, budget=limits, progress_every=progress_every,
+                        progress_callback=progress if progress_every > 0 else None)
+    seconds = time.perf_counter() - start
+    if isinstance(result, Unknown):
+        conn.send(("result", job_id, "unknown", result.reason, seconds))
+        return result.reason
+    if result is None:
+        conn.send(("result", job_id, "unsat", None, seconds))
+    else:
+        model = [var if result[var].value else -var for var in cnf.variables()]
+        conn.send(("result", job_id, "sat", model, seconds))
+    return None
+
+
+def _worker(conn, interrupt):
+    # the server handles ^C and shuts the workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        job_id, dimacs, budget, progress_every = task
+        try:
+            reason = _solve_job(conn, job_id, dimacs, budget, progress_every, interrupt)
+        except Exception:
+            conn.send(("error", job_id, traceback.format_exc().strip().splitlines()[-1]))
+            continue
+        if reason == "memory":
+            # the peak RSS never goes down again, so every later job would
+            # run out of memory too; the server starts a fresh worker
+            return
+
+
+class Worker:
+    """
+    A solver process, fed one job at a time through a pipe. The interrupt
+    event is the Budget.interrupt of the job it runs; the server clears it
+    before it sends the next job, so a cancel cannot get lost in between.
+    """
+
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.interrupt = ctx.Event()
+        self.process = ctx.Process(target=_worker, args=(child, self.interrupt), daemon=True)
+        self.process.start()
+        child.close()
+        self.job: Optional[Job] = None
+        self.retiring = False  # exits after its job, gets no new one
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class SolveServer:
+    """
+    Solves DIMACS formulas sent over a Unix or TCP socket (see the protocol
+    above) in a pool of pre-forked worker processes, so that the interpreter
+    start and the imports are paid once instead of for every formula.
+
+    Jobs wait in one FIFO queue and go to the first idle worker. The
+    asyncio event loop reads the workers' pipes as well as the sockets, so
+    progress and results are written to the client as soon as they arrive.
+    A job is cancelled by setting its worker's interrupt event, which
+    cdcl_solve checks along with the rest of the job's budget, in the
+    phases before the search as well as during it; a queued job is just
+    dropped. When a client disconnects, its jobs are cancelled. A
+    worker that dies is replaced, and so is one that ran out of memory.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.num_workers = workers or os.cpu_count() or 1
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            # workers forked later, to replace one, must not inherit the
+            # client sockets, so they come from a fork server that has the
+            # solver imported already
+            self.ctx = multiprocessing.get_context("forkserver")
+            self.ctx.set_forkserver_preload(["__main__", "cdcl_solver"])
+        else:
+            self.ctx = multiprocessing.get_context()
+        self.workers: List[Worker] = []
+        self.queue: Deque[Job] = collections.deque()
+        self.jobs: Dict[int, Job] = {}  # queued and running jobs by id
+        self.next_id = 1
+        self.done = 0
+        self.latencies: Deque[float] = collections.deque(maxlen=LATENCY_WINDOW)
+        self.waits: Deque[float] = collections.deque(maxlen=LATENCY_WINDOW)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.clients: Set[asyncio.StreamWriter] = set()
+
+    def start_workers(self):
+        self.loop = asyncio.get_running_loop()
+        for _ in range(self.num_workers):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = Worker(self.ctx)
+        self.workers.append(worker)
+        self.loop.add_reader(worker.conn.fileno(), self._on_worker_message, worker)
+
+    def stop_workers(self):
+        for worker in self.workers:
+            self.loop.remove_reader(worker.conn.fileno())
+            worker.stop()
+        self.workers = []
+
+    def stats(self) -> ServerStats:
+        latencies = sorted(self.latencies)
+        waits = sorted(self.waits)
+        return ServerStats(len(self.workers), len(self.queue), sum(w.job is not None for w in self.workers),
+                           self.done, percentile(latencies, 50), percentile(latencies, 90),
+                           percentile(latencies, 99), percentile(waits, 50), percentile(waits, 99))
+
+    def submit(self, dimacs: bytes, budget: Dict[str, float], progress_every: int,
+               writer: asyncio.StreamWriter) -> Job:
+        job = Job(self.next_id, dimacs, budget, progress_every, writer, time.perf_counter())
+        self.next_id += 1
+        self.jobs[job.id] = job
+        self.queue.append(job)
+        # before the job can make any other line
+        _send(writer, f"QUEUED {job.id}")
+        self._dispatch()
+        return job
+
+    def cancel(self, job: Job):
+        if job.cancelled:
+            return
+        job.cancelled = True
+        if job.worker is not None:
+            job.worker.interrupt.set()
+        else:
+            self.queue.remove(job)
+            self._finish(job, f"RESULT {job.id} unknown seconds=0.000000 reason=interrupted")
+
+    def _dispatch(self):
+        for worker in self.workers:
+            if not self.queue:
+                return
+            if worker.job is None and not worker.retiring:
+                job = self.queue.popleft()
+                job.started = time.perf_counter()
+                job.worker = worker
+                worker.job = job
+                worker.interrupt.clear()
+                worker.conn.send((job.id, job.dimacs, job.budget, job.progress_every))
+                job.dimacs = b""
+
+    def _finish(self, job: Job, *lines: str):
+        del self.jobs[job.id]
+        now = time.perf_counter()
+        self.done += 1
+        self.latencies.append(now - job.submitted)
+        self.waits.append((job.started or now) - job.submitted)
+        if job.worker is not None:
+            job.worker.job = None
+        _send(job.writer, *lines)
+        job.finished.set()
+
+    def _on_worker_message(self, worker: Worker):
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            self._replace(worker)
+            return
+        kind, job_id = message[0], message[1]
+        job = worker.job
+        if job is None or job.id != job_id:
+            return
+        if kind == "progress":
+            seconds, conflicts, decisions, propagations, restarts, learnts = message[2]
+            _send(job.writer, f"PROGRESS {job_id} seconds={seconds:.6f} conflicts={conflicts} "
+                              f"decisions={decisions} propagations={propagations} restarts={restarts} "
+                              f"learnts={learnts}")
+            return
+        if kind == "error":
+            self._finish(job, f"ERROR {job_id} {message[2]}")
+        else:
+            status, payload, seconds = message[2:]
+            if status == "sat":
+                self._finish(job, f"RESULT {job_id} sat seconds={seconds:.6f}",
+                             f"MODEL {job_id} {' '.join(map(str, payload + [0]))}")
+            elif status == "unsat":
+                self._finish(job, f"RESULT {job_id} unsat seconds={seconds:.6f}")
+            else:
+                worker.retiring = payload == "memory"
+                self._finish(job, f"RESULT {job_id} unknown seconds={seconds:.6f} reason={payload}")
+        self._dispatch()
+
+    def _replace(self, worker: Worker):
+        self.loop.remove_reader(worker.conn.fileno())
+        worker.process.join()
+        worker.conn.close()
+        self.workers.remove(worker)
+        if worker.job is not None:
+            self._finish(worker.job, f"ERROR {worker.job.id} worker exited with code {worker.process.exitcode}")
+        self._add_worker()
+        self._dispatch()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        own: Dict[int, Job] = {}
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode(errors="replace").split()
+                if not words:
+                    continue
+                command = words[0].upper()
+                if command == "SOLVE":
+                    dimacs = await _read_body(reader)
+                    if dimacs is None:
+                        break
+                    try:
+                        budget, progress_every = _parse_options(words[1:])
+                    except ValueError as e:
+                        _send(writer, f"ERROR - {e}")
+                        continue
+                    job = self.submit(dimacs, budget, progress_every, writer)
+                    own[job.id] = job
+                elif command == "CANCEL":
+                    # only the connection's own jobs, so clients cannot cancel each other's
+                    job = own.get(int(words[1])) if len(words) == 2 and words[1].isdigit() else None
+                    if job is None or job.id not in self.jobs:
+                        _send(writer, f"ERROR - no queued or running job {' '.join(words[1:])} of this client")
+                    else:
+                        self.cancel(job)
+                elif command == "STATS":
+                    _send(writer, "STATS " + " ".join(
+                        f"{name}={value:.6f}" if isinstance(value, float) else f"{name}={value}"
+                        for name, value in asdict(self.stats()).items()))
+                elif command == "QUIT":
+                    for job in list(own.values()):
+                        await job.finished.wait()
+                    await writer.drain()
+                    break
+                else:
+                    _send(writer, f"ERROR - unknown command {words[0]}")
+                for job_id in [job_id for job_id in own if job_id not in self.jobs]:
+                    del own[job_id]
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            _send(writer, f"ERROR - {e}")
+        finally:
+            self.clients.discard(writer)
+            for job in own.values():
+                if job.id in self.jobs:
+                    self.cancel(job)
+            writer.close()
+
+
+def _send(writer: asyncio.StreamWriter, *lines: str):
+    if not writer.is_closing():
+        writer.write("".join(line + "\n" for line in lines).encode())
+
+
+async def _read_body(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """
+    The lines up to END, or None if the connection closed first.
+    """
+    lines = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            return None
+        if line.strip() == b"END":
+            return b"".join(lines)
+        lines.append(line)
+
+
+def _parse_options(words: List[str]):
+    budget = {}
+    progress_every = 0
+    for word in words:
+        name, _, value = word.partition("=")
+        try:
+            if name == "progress":
+                progress_every = int(value)
+            elif name in BUDGET_FIELDS:
+                budget[name] = BUDGET_FIELDS[name](value)
+            else:
+                raise ValueError(f"unknown option {word}")
+        except ValueError:
+            raise ValueError(f"bad option {word}") from None
+    return budget, progress_every
+
+
+async def serve(address: str, workers: Optional[int] = None):
+    """
+    Run a SolveServer until SIGINT or SIGTERM, on a Unix socket if address
+    is a path, or on a TCP port of localhost if it is a number.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    server = SolveServer(workers)
+    server.start_workers()
+    if address.isdigit():
+        listener = await asyncio.start_server(server.handle_client, "127.0.0.1", int(address), limit=MAX_LINE)
+    else:
+        listener = await asyncio.start_unix_server(server.handle_client, address, limit=MAX_LINE)
+    print(f"Serving on {address} with {len(server.workers)} workers", file=sys.stderr, flush=True)
+    try:
+        async with listener:
+            await stop.wait()
+            # the clients see the connection close and their handlers return
+            for writer in list(server.clients):
+                writer.close()
+            while server.clients:
+                await asyncio.sleep(0.01)
+    finally:
+        server.stop_workers()
+        if not address.isdigit() and os.path.exists(address):
+            os.unlink(address)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python solve_server.py <unix socket path | TCP port> [workers]")
+        sys.exit(1)
+
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    asyncio.run(serve(sys.argv[1], workers))
@@ -0,0 +1,1198 @@
+import random, time
+from itertools import chain
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from budget import CHECK_EVERY, Budget
+from clause_db import LearntClauseDB
+from restarts import RestartPolicy, RestartRecord, make_restart_policy
+from stats import PhaseTimers, ProgressPrinter, SolverStats
+from vsids import VSIDS
+
+# Literals are plain ints: variable v is 2*v when positive and 2*v+1 when
+# negated, so the negation of a literal is lit ^ 1 and its variable is lit >> 1.
+# Index 0 and 1 are never used, which lets DIMACS variable numbers be used
+# directly as array indices.
+
+def lit_from_dimacs(x: int) -> int:
+    """
+    Encode a non-zero DIMACS integer as a literal.
+    """
+    return (x << 1) if x > 0 else ((-x << 1) | 1)
+
+
+def lit_to_dimacs(lit: int) -> int:
+    """
+    Decode a literal back into its DIMACS integer.
+    """
+    return -(lit >> 1) if lit & 1 else lit >> 1
+
+
+def lit_var(lit: int) -> int:
+    return lit >> 1
+
+
+def lit_neg(lit: int) -> int:
+    return lit ^ 1
+
+
+def lit_sign(lit: int) -> bool:
+    """
+    True if the literal is negated.
+    """
+    return bool(lit & 1)
+
+
+# value of a literal in Solver.value
+TRUE = 1
+FALSE = -1
+UNDEF = 0
+
+# reason of a decision or of an unassigned variable
+NO_REASON = -1
+
+# Binary clauses are not stored in the arena. A binary clause (a, b) is a
+# watcher (BINARY, b) on a and (BINARY, a) on b, so the watch lists of the
+# negated literals form the binary implication graph. A literal implied by a
+# binary clause gets the reason binary_reason(other) = -2 - other, where
+# other is the false literal of the clause, and propagate() reports a
+# conflicting binary clause as BINARY_CONFLICT with its literals in
+# Solver.binary_conflict.
+BINARY = -1
+BINARY_CONFLICT = -2
+
+
+def binary_reason(other: int) -> int:
+    return -2 - other
+
+# how pick_branching_literal chooses the sign of a decision:
+#   saved  - the value the variable had when it was last unassigned
+#   false  - always negative
+#   true   - always positive
+#   random - a coin flip from the random module
+#   target - the value on the longest conflict-free trail since the last
+#            restart, falling back to the saved phase
+#   best   - the value on the longest conflict-free trail so far, falling
+#            back to the saved phase
+POLARITY_MODES = ("saved", "false", "true", "random", "target", "best")
+
+# a target or best phase that was never recorded
+NO_PHASE = -1
+
+
+class ClauseArena:
+    """
+    All clauses stored back to back in one flat int array.
+
+    A clause is addressed by the index of its header (its clause reference,
+    or cref). The header holds the clause size, flags, LBD and activity, and
+    is followed by the literals, 4 bytes each.
+
+    A cref stays valid until the next collect(). Deleted clauses stay in
+    place and are counted as wasted words, and collect() copies the live
+    clauses into a new array and returns where each of them moved, so that
+    the owner can relocate the crefs it holds.
+    """
+
+    # header word offsets
+    SIZE = 0
+    FLAGS = 1
+    LBD = 2
+    ACTIVITY = 3
+    HEADER = 4
+
+    # flag bits
+    LEARNT = 1
+    DELETED = 2
+
+    def __init__(self):
+        self.data = array('i')
+        self.wasted = 0 # words of deleted clauses
+        self.collections = 0
+
+    def add(self, lits: List[int], learnt: bool = False, lbd: int = 0) -> int:
+        cref = len(self.data)
+        self.data.extend((len(lits), self.LEARNT if learnt else 0, lbd, 0))
+        self.data.extend(lits)
+        return cref
+
+    def size(self, cref: int) -> int:
+        return self.data[cref]
+
+    def is_learnt(self, cref: int) -> bool:
+        return bool(self.data[cref + self.FLAGS] & self.LEARNT)
+
+    def is_deleted(self, cref: int) -> bool:
+        return bool(self.data[cref + self.FLAGS] & self.DELETED)
+
+    def delete(self, cref: int):
+        data = self.data
+        if not data[cref + self.FLAGS] & self.DELETED:
+            data[cref + self.FLAGS] |= self.DELETED
+            self.wasted += self.HEADER + data[cref]
+
+    def lbd(self, cref: int) -> int:
+        return self.data[cref + self.LBD]
+
+    def activity(self, cref: int) -> int:
+        return self.data[cref + self.ACTIVITY]
+
+    def lits(self, cref: int) -> array:
+        start = cref + self.HEADER
+        return self.data[start:start + self.data[cref]]
+
+    def bytes(self) -> int:
+        return len(self.data) * self.data.itemsize
+
+    def collect(self, crefs: Iterable[int]) -> Dict[int, int]:
+        """
+        Compact the arena: copy the clauses crefs into a new array, in order,
+        and drop every other clause. Return a map from their old crefs to
+        their new ones.
+        """
+        old = self.data
+        data = array('i')
+        moved = {}
+        header = self.HEADER
+        for cref in crefs:
+            moved[cref] = len(data)
+            data.extend(old[cref:cref + header + old[cref]])
+        self.data = data
+        self.wasted = 0
+        self.collections += 1
+        return moved
+
+    def __len__(self):
+        return len(self.data)
+
+
+class Solver:
+    """
+    CDCL solver over integer literals.
+
+    Per-literal values and per-variable decision levels, reasons and trail
+    positions are kept in arrays indexed by literal or variable, and a reason
+    is the cref of the clause that implied the assignment, or a
+    binary_reason() for a binary clause.
+
+    Assigned literals are pushed on the trail in assignment order, and
+    trail_lim holds the trail index where each decision level starts, so
+    backtracking only pops the literals above the target level.
+
+    The solver is incremental: clauses can be added between solve() calls,
+    and each call can be given assumptions. Learned clauses, variable
+    activities and saved phases carry over from one call to the next.
+
+    simplify() can replace variables by an equivalent literal (see
+    inprocess.py). Clauses and assumptions given later are rewritten with
+    the same substitution, and model() gives the substituted variables the
+    value of their representative.
+    """
+
+    def __init__(self, num_vars: int = 0, core_lbd: int = 2, max_learnt_bytes: int = 64 << 20,
+                 var_decay: float = 0.95, polarity: str = "saved", gc_fraction: float = 0.2,
+                 sharing=None, inprocessor=None, phase_seeder=None, propagator=None, profile: bool = False, progress_every: int = 0, progress_callback: Optional[Callable[[SolverStats], None]] = None):
+        if polarity not in POLARITY_MODES:
+            raise ValueError(f"unknown polarity mode {polarity!r}, expected one of {', '.join(POLARITY_MODES)}")
+        self.arena = ClauseArena()
+        self.clauses = [] # crefs of the original clauses, without the binary ones
+        self.binaries = 0 # binary clauses, original and learned, kept in the watch lists only
+        self.binary_conflict = (0, 0) # literals of the last BINARY_CONFLICT
+        self.learnts = LearntClauseDB(self.arena, core_lbd, max_learnt_bytes)
+        self.gc_fraction = gc_fraction # wasted share of the arena that triggers a collection
+        self.num_vars = 0
+        self.value = array('b', [UNDEF, UNDEF])
+        self.level = array('i', [0])
+        self.reason = array('i', [NO_REASON])
+        self.trail_pos = array('i', [0])
+        self.seen = array('b', [0]) # per-variable marker used by analyze()
+        self.polarity = polarity
+        # phases are literal signs: 0 is positive and 1 is negative
+        self.saved_phase = array('b', [1])
+        self.target_phase = array('b', [NO_PHASE])
+        self.best_phase = array('b', [NO_PHASE])
+        self.target_size = 0 # trail length the target phases were taken from
+        self.best_size = 0
+        self.analyze_toclear = []
+        self.trail = [] # assigned literals in assignment order
+        self.trail_lim = [] # trail index where each decision level starts
+        self.watches = [[], []] # flat (cref or BINARY, blocker) watchers of each literal
+        self.qhead = 0 # trail index of the next literal to propagate
+        self.vsids = VSIDS(var_decay)
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0 # literals propagated
+        self.learnt_total = 0 # learned clauses added
+        self.lbd_sum = 0 # over all learned clauses
+        self.solve_seconds = 0.0 # spent in finished solve() calls
+        self.solve_start = None # perf_counter() at the start of the running solve()
+        self.timers = PhaseTimers() if profile else None
+        # called with stats() every progress_every conflicts; by default a
+        # progress line is printed when progress_every is set
+        self.progress_every = progress_every
+        if progress_callback is None and progress_every > 0:
+            progress_callback = ProgressPrinter()
+        self.progress_callback = progress_callback
+        self.restart_log = [] # a RestartRecord per restart
+        self.sharing = sharing # a clause_sharing.SharingEndpoint, or None
+        self.inprocessor = inprocessor # an inprocess.Inprocessor, or None
+        self.phase_seeder = phase_seeder # a local_search.PhaseSeeder, or None
+        self.propagator = propagator # a xor_gauss.XorPropagator, or None
+        self.representative = array('i', [0, 1]) # literal -> the literal that replaced it
+        self.substitutions = [] # (positive literal, representative) in substitution order
+        self.frozen = bytearray(1) # variables that must not be substituted
+        self.failed_assumptions = [] # assumptions that made the last solve() fail
+        self.interrupt_requested = False # set by interrupt(), possibly from another thread
+        # the budget of the running solve() and its deadline, for the phase seeder
+        self.budget: Optional[Budget] = None
+        self.deadline: Optional[float] = None
+        self.stop_reason = None # why the last solve() returned None
+        self.ok = True # False once the clauses are known to be unsatisfiable
+        if num_vars > 0:
+            self.new_vars(num_vars)
+
+    def new_vars(self, count: int) -> int:
+        """
+        Allocate count new variables at once and return the last one.
+        """
+        first = self.num_vars + 1
+        self.num_vars += count
+        self.value.extend(array('b', [UNDEF]) * (2 * count))
+        self.level.extend(array('i', [0]) * count)
+        self.reason.extend(array('i', [NO_REASON]) * count)
+        self.trail_pos.extend(array('i', [0]) * count)
+        self.seen.extend(array('b', [0]) * count)
+        self.saved_phase.extend(array('b', [1]) * count)
+        self.target_phase.extend(array('b', [NO_PHASE]) * count)
+        self.best_phase.extend(array('b', [NO_PHASE]) * count)
+        self.watches.extend([] for _ in range(2 * count))
+        self.representative.extend(range(2 * first, 2 * self.num_vars + 2))
+        self.frozen.extend(bytes(count))
+        for var in range(first, self.num_vars + 1):
+            self.vsids.add_var(var)
+        return self.num_vars
+
+    def new_var(self) -> int:
+        return self.new_vars(1)
+
+    def lit_value(self, lit: int) -> int:
+        return self.value[lit]
+
+    def decision_level(self) -> int:
+        return len(self.trail_lim)
+
+    def new_decision_level(self):
+        self.trail_lim.append(len(self.trail))
+
+    def assign(self, lit: int, reason: int):
+        var = lit >> 1
+        self.value[lit] = TRUE
+        self.value[lit ^ 1] = FALSE
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail_pos[var] = len(self.trail)
+        self.trail.append(lit)
+
+    def add_clause(self, lits: Iterable[int]) -> bool:
+        """
+        Add a clause of the original formula, also between solve() calls.
+
+        The solver goes back to decision level 0, and literals false at level
+        0 are left out so that the watches stay valid; a clause satisfied at
+        level 0 is not stored, and a binary clause only gets its two
+        watchers. This costs O(clause size) plus the backtrack.
+
+        Return False if the clauses became trivially unsatisfiable.
+        """
+        lits = list(dict.fromkeys(lits)) # remove duplicate literals, keep order
+        if lits:
+            max_var = max(lits) >> 1
+            if max_var > self.num_vars:
+                self.new_vars(max_var - self.num_vars)
+        if not self.ok:
+            return False
+        if self.trail_lim:
+            self.backtrack(0)
+        if self.substitutions:
+            representative = self.representative
+            lits = list(dict.fromkeys(representative[lit] for lit in lits))
+        value = self.value
+        if any(value[lit] == TRUE for lit in lits):
+            return True
+        lits = [lit for lit in lits if value[lit] != FALSE]
+        if len(lits) == 0:
+            self.ok = False
+            return False
+
+        if len(lits) == 2:
+            self.attach_binary(lits[0], lits[1])
+            return True
+        cref = self.arena.add(lits)
+        self.clauses.append(cref)
+        if len(lits) == 1:
+            self.assign(lits[0], cref)
+        else:
+            self.attach_clause(cref)
+        return True
+
+    def attach_clause(self, cref: int):
+        """
+        Watch the first two literals of a clause of two or more literals.
+
+        A watcher is a (cref, blocker) pair stored flat in the watch list of
+        the watched literal; the blocker is the other watched literal, and
+        while it is true the clause does not need to be visited.
+        """
+        data = self.arena.data
+        start = cref + ClauseArena.HEADER
+        first, second = data[start], data[start + 1]
+        self.watches[first].extend((cref, second))
+        self.watches[second].extend((cref, first))
+
+    def attach_binary(self, a: int, b: int):
+        """
+        Add the binary clause (a, b) as a pair of BINARY watchers whose
+        blocker is the other literal, so that propagating it never reads the
+        arena.
+        """
+        self.watches[a].extend((BINARY, b))
+        self.watches[b].extend((BINARY, a))
+        self.binaries += 1
+
+    def binary_implications(self, lit: int) -> List[int]:
+        """
+        The literals that lit implies through a binary clause: its outgoing
+        edges in the binary implication graph.
+        """
+        ws = self.watches[lit ^ 1]
+        return [ws[i + 1] for i in range(0, len(ws), 2) if ws[i] == BINARY]
+
+    def binary_clauses(self) -> Iterator[Tuple[int, int]]:
+        """
+        Each binary clause once, as a pair (a, b) with a < b.
+        """
+        for lit, ws in enumerate(self.watches):
+            for i in range(0, len(ws), 2):
+                if ws[i] == BINARY and lit < ws[i + 1]:
+                    yield lit, ws[i + 1]
+
+    def propagate(self) -> int:
+        """
+        Propagate the literals on the trail that have not been propagated yet.
+
+        The two watched literals of a clause are kept at positions 0 and 1 of
+        the clause. Return the cref of a conflicting clause, BINARY_CONFLICT,
+        or NO_REASON.
+        """
+        value = self.value
+        data = self.arena.data
+        watches = self.watches
+        trail = self.trail
+        confl = NO_REASON
+        propagations = 0
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            propagations += 1
+            ws = watches[false_lit]
+
+            # compact the watch list in place: watchers are read at i and
+            # the ones that stay on this literal are written back at j
+            i = j = 0
+            n = len(ws)
+            while i < n:
+                cref = ws[i]
+                blocker = ws[i + 1]
+                i += 2
+                if value[blocker] == TRUE:
+                    ws[j] = cref
+                    ws[j + 1] = blocker
+                    j += 2
+                    continue
+                if cref == BINARY:
+                    # the blocker is the other literal of the clause
+                    ws[j] = cref
+                    ws[j + 1] = blocker
+                    j += 2
+                    if value[blocker] == UNDEF:
+                        self.assign(blocker, -2 - false_lit)
+                        continue
+                    confl = BINARY_CONFLICT
+                    self.binary_conflict = (false_lit, blocker)
+                    self.qhead = len(trail)
+                    while i < n:
+                        ws[j] = ws[i]
+                        ws[j + 1] = ws[i + 1]
+                        i += 2
+                        j += 2
+                    break
+
+                # make sure the false literal is at position 1
+                start = cref + ClauseArena.HEADER
+                first = data[start]
+                if first == false_lit:
+                    first = data[start + 1]
+                    data[start] = first
+                    data[start + 1] = false_lit
+                if first != blocker and value[first] == TRUE:
+                    ws[j] = cref
+                    ws[j + 1] = first
+                    j += 2
+                    continue
+
+                # look for a non-false literal to watch instead
+                for k in range(start + 2, start + data[cref]):
+                    lit = data[k]
+                    if value[lit] != FALSE:
+                        data[start + 1] = lit
+                        data[k] = false_lit
+                        watches[lit].extend((cref, first))
+                        break
+                else:
+                    # the clause is unit or conflicting under the assignment
+                    ws[j] = cref
+                    ws[j + 1] = first
+                    j += 2
+                    if value[first] == FALSE:
+                        confl = cref
+                        self.qhead = len(trail)
+                        while i < n:
+                            ws[j] = ws[i]
+                            ws[j + 1] = ws[i + 1]
+                            i += 2
+                            j += 2
+                    else:
+                        self.assign(first, cref)
+            del ws[j:]
+
+        self.propagations += propagations
+        return confl
+
+    def analyze(self, confl: int) -> Tuple[int, Optional[List[int]]]:
+        """
+        First-UIP conflict analysis.
+
+        Walk the trail backwards from the conflict, resolving on the seen
+        literals of the current decision level and counting how many of them
+        are still open, until a single one (the UIP) is left. Return the
+        backtrack level and the minimized learned clause, with the asserting
+        literal at position 0 and a literal of the backtrack level at
+        position 1, or -1 on a conflict at level 0.
+        """
+        dl = len(self.trail_lim)
+        if dl == 0:
+            return -1, None
+
+        data = self.arena.data
+        level = self.level
+        reason = self.reason
+        seen = self.seen
+        trail = self.trail
+        bump = self.vsids.bump
+        learnt = [0] # position 0 is filled with the asserting literal
+        counter = 0 # seen literals of the current level not resolved yet
+        p = -1
+        index = len(trail) - 1
+        while True:
+            if confl >= 0:
+                if data[confl + ClauseArena.FLAGS] & ClauseArena.LEARNT:
+                    self.bump_clause(confl)
+                start = confl + ClauseArena.HEADER
+                # position 0 of a reason clause is the literal it implied
+                lits = data[start + 1 if p != -1 else start:start + data[confl]]
+            elif confl == BINARY_CONFLICT:
+                lits = self.binary_conflict
+            else:
+                lits = (-2 - confl,)
+            for q in lits:
+                var = q >> 1
+                if not seen[var] and level[var] > 0:
+                    seen[var] = 1
+                    bump(var)
+                    if level[var] >= dl:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+
+            # select the next seen literal on the trail
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            p = trail[index]
+            index -= 1
+            confl = reason[p >> 1]
+            seen[p >> 1] = 0
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = p ^ 1
+
+        # drop the literals implied by the rest of the clause, and find the
+        # backtrack level (the largest level among the other literals)
+        to_clear = self.analyze_toclear
+        to_clear[:] = learnt
+        abstract_levels = 0
+        for lit in learnt[1:]:
+            abstract_levels |= 1 << (level[lit >> 1] & 31)
+        j = 1
+        b = 0
+        for i in range(1, len(learnt)):
+            lit = learnt[i]
+            if reason[lit >> 1] == NO_REASON or not self.lit_redundant(lit, abstract_levels):
+                learnt[j] = lit
+                lit_level = level[lit >> 1]
+                if lit_level > b:
+                    b = lit_level
+                    learnt[1], learnt[j] = learnt[j], learnt[1]
+                j += 1
+        del learnt[j:]
+
+        for lit in to_clear:
+            seen[lit >> 1] = 0
+        return b, learnt
+
+    def lit_redundant(self, p: int, abstract_levels: int) -> bool:
+        """
+        Check whether the false literal p is implied by the other literals of
+        the learned clause, by following reasons depth first. Literals from
+        decision levels not in the clause (per abstract_levels) end the search
+        early since they can never be implied by it.
+        """
+        data = self.arena.data
+        level = self.level
+        reason = self.reason
+        seen = self.seen
+        to_clear = self.analyze_toclear
+        top = len(to_clear)
+        stack = [p]
+        while stack:
+            cref = reason[stack.pop() >> 1]
+            if cref >= 0:
+                start = cref + ClauseArena.HEADER
+                lits = data[start + 1:start + data[cref]]
+            else:
+                lits = (-2 - cref,)
+            for q in lits:
+                var = q >> 1
+                if not seen[var] and level[var] > 0:
+                    if reason[var] != NO_REASON and (1 << (level[var] & 31)) & abstract_levels:
+                        seen[var] = 1
+                        stack.append(q)
+                        to_clear.append(q)
+                    else:
+                        for lit in to_clear[top:]:
+                            seen[lit >> 1] = 0
+                        del to_clear[top:]
+                        return False
+        return True
+
+    def analyze_final(self, p: int) -> List[int]:
+        """
+        Return the assumptions that imply the true literal p, which falsifies
+        the assumption p ^ 1, together with that assumption: the reasons are
+        followed back from p, and every decision reached is an assumption.
+        """
+        core = [p ^ 1]
+        if not self.trail_lim:
+            return core
+        data = self.arena.data
+        level = self.level
+        reason = self.reason
+        seen = self.seen
+        trail = self.trail
+        seen[p >> 1] = 1
+        for i in range(len(trail) - 1, self.trail_lim[0] - 1, -1):
+            lit = trail[i]
+            var = lit >> 1
+            if not seen[var]:
+                continue
+            cref = reason[var]
+            if cref == NO_REASON:
+                core.append(lit)
+            elif cref < 0:
+                if level[(-2 - cref) >> 1] > 0:
+                    seen[(-2 - cref) >> 1] = 1
+            else:
+                start = cref + ClauseArena.HEADER
+                for k in range(start + 1, start + data[cref]):
+                    if level[data[k] >> 1] > 0:
+                        seen[data[k] >> 1] = 1
+            seen[var] = 0
+        seen[p >> 1] = 0
+        return core
+
+    def bump_clause(self, cref: int):
+        """
+        Bump the activity of a learned clause used in conflict analysis, and
+        lower its LBD if it now spans fewer decision levels.
+        """
+        data = self.arena.data
+        data[cref + ClauseArena.ACTIVITY] += 1
+        lbd = data[cref + ClauseArena.LBD]
+        if lbd > self.learnts.core_lbd:
+            new_lbd = self.compute_lbd(self.arena.lits(cref))
+            if new_lbd < lbd:
+                data[cref + ClauseArena.LBD] = new_lbd
+
+    def add_learnt_clause(self, lits: List[int], lbd: int) -> int:
+        """
+        Store a learned clause as returned by analyze() and watch its first
+        two literals. Return the reason to assign the asserting literal
+        lits[0] with: NO_REASON for a unit, which is not stored since it is
+        assigned at level 0, and a binary_reason() for a binary clause.
+        """
+        self.learnt_total += 1
+        self.lbd_sum += lbd
+        if len(lits) == 1:
+            return NO_REASON
+        if len(lits) == 2:
+            self.attach_binary(lits[0], lits[1])
+            return -2 - lits[1]
+        cref = self.arena.add(lits, learnt=True, lbd=lbd)
+        self.learnts.add(cref)
+        self.attach_clause(cref)
+        return cref
+
+    def explain(self, lits: List[int]) -> int:
+        """
+        Take a clause derived by a propagator outside the clause database.
+        Either every literal is false, a conflict, or every literal but
+        lits[0] is false and lits[0] is implied. The clause is learned, and
+        if its false literals are all below the current decision level the
+        solver backtracks to the highest of them first. Return NO_REASON
+        after assigning an implied literal, else the conflict for analyze().
+        """
+        value = self.value
+        level = self.level
+        if len(lits) <= 1:
+            # holds at level 0, or the clauses are unsatisfiable
+            self.backtrack(0)
+            if lits and value[lits[0]] == UNDEF:
+                self.assign(lits[0], self.add_learnt_clause(lits, 1))
+                return NO_REASON
+            # analyze() reports the conflict at level 0 without reading it
+            return BINARY_CONFLICT
+        implied = value[lits[0]] == UNDEF
+        first = 1 if implied else 0
+        lits = lits[:first] + sorted(lits[first:], key=lambda lit: -level[lit >> 1])
+        top = level[lits[first] >> 1]
+        if top < len(self.trail_lim):
+            self.backtrack(top)
+        reason = self.add_learnt_clause(lits, self.compute_lbd(lits))
+        if implied:
+            self.assign(lits[0], reason)
+            return NO_REASON
+        if len(lits) == 2:
+            self.binary_conflict = (lits[0], lits[1])
+            return BINARY_CONFLICT
+        return reason
+
+    def add_root_clause(self, lits: List[int], lbd: int) -> bool:
+        """
+        Add a learned clause at decision level 0, e.g. one imported from a
+        parallel worker. Literals false at level 0 are dropped. Return False
+        if the clause was already satisfied at level 0.
+        """
+        value = self.value
+        if self.substitutions:
+            representative = self.representative
+            lits = [representative[lit] for lit in lits]
+        lits = [lit for lit in dict.fromkeys(lits) if value[lit] != FALSE]
+        if any(value[lit] == TRUE for lit in lits):
+            return False
+        if len(lits) == 0:
+            self.ok = False
+        elif len(lits) == 1:
+            self.assign(lits[0], NO_REASON)
+        elif len(lits) == 2:
+            self.attach_binary(lits[0], lits[1])
+        else:
+            cref = self.arena.add(lits, learnt=True, lbd=min(lbd, len(lits)))
+            self.learnts.add(cref)
+            self.attach_clause(cref)
+        return True
+
+    def import_shared_clauses(self) -> bool:
+        """
+        Take in the clauses published by the other workers, backtracking to
+        level 0 first if there are any. Return False if that makes the
+        clauses unsatisfiable.
+        """
+        sharing = self.sharing
+        clauses = sharing.fetch()
+        if not clauses:
+            return True
+        self.backtrack(0)
+        imported = 0
+        for lits, lbd in clauses:
+            if self.add_root_clause(lits, lbd):
+                imported += 1
+            if not self.ok:
+                break
+        sharing.note_imported(imported)
+        sharing.note_dropped(len(clauses) - imported)
+        if self.ok and self.propagate() != NO_REASON:
+            self.ok = False
+        return self.ok
+
+    def locked(self, cref: int) -> bool:
+        """
+        Whether the clause is the reason of its first literal's assignment.
+        """
+        lit = self.arena.data[cref + ClauseArena.HEADER]
+        return self.value[lit] == TRUE and self.reason[lit >> 1] == cref
+
+    def reduce_db(self):
+        """
+        Delete low-value learned clauses and drop their watchers. Binary
+        clauses are never deleted.
+        """
+        if not self.learnts.reduce(self.conflicts, self.locked):
+            return
+        data = self.arena.data
+        flags = ClauseArena.FLAGS
+        deleted = ClauseArena.DELETED
+        for ws in self.watches:
+            j = 0
+            for i in range(0, len(ws), 2):
+                if ws[i] == BINARY or not data[ws[i] + flags] & deleted:
+                    ws[j] = ws[i]
+                    ws[j + 1] = ws[i + 1]
+                    j += 2
+            del ws[j:]
+        if self.arena.wasted > self.gc_fraction * len(self.arena):
+            self.garbage_collect()
+
+    def garbage_collect(self):
+        """
+        Compact the arena and relocate every cref the solver holds: the
+        clause lists, the watchers and the reasons on the trail. The watchers
+        of deleted clauses must be gone already.
+        """
+        moved = self.arena.collect(chain(self.clauses, self.learnts))
+        self.clauses = [moved[cref] for cref in self.clauses]
+        self.learnts.relocate(moved)
+        for ws in self.watches:
+            for i in range(0, len(ws), 2):
+                if ws[i] != BINARY:
+                    ws[i] = moved[ws[i]]
+        reason = self.reason
+        for lit in self.trail:
+            cref = reason[lit >> 1]
+            if cref >= 0:
+                reason[lit >> 1] = moved[cref]
+
+    def freeze(self, var: int):
+        """
+        Keep var from being substituted, e.g. because it is assumed later.
+        """
+        self.frozen[var] = 1
+
+    def simplify(self, substitute: Optional[Sequence[int]] = None) -> bool:
+        """
+        Rewrite every clause at decision level 0: clauses satisfied at level
+        0 are dropped and false literals removed. If substitute is given,
+        every literal is also replaced by substitute[lit], which must map
+        lit ^ 1 to substitute[lit] ^ 1 and leave assigned and frozen
+        variables alone; the substituted variables leave the decision order
+        and are recorded for model().
+
+        Clauses that become unit are assigned and propagated. Return False
+        if the clauses became unsatisfiable.
+        """
+        self.backtrack(0)
+        if not self.ok or self.propagate() != NO_REASON:
+            self.ok = False
+            return False
+        if substitute is not None:
+            for var in range(1, self.num_vars + 1):
+                lit = var << 1
+                if substitute[lit] != lit:
+                    self.substitutions.append((lit, substitute[lit]))
+                    self.vsids.remove(var)
+            representative = self.representative
+            for lit in range(2, len(representative)):
+                representative[lit] = substitute[representative[lit]]
+
+        # level 0 assignments are never explained, so their reason clauses
+        # can be rewritten like any other
+        reason = self.reason
+        for lit in self.trail:
+            reason[lit >> 1] = NO_REASON
+        arena = self.arena
+        data = arena.data
+        value = self.value
+        binaries = list(self.binary_clauses())
+        clauses = self.clauses
+        learnts = self.learnts.clear()
+        for ws in self.watches:
+            del ws[:]
+        self.binaries = 0
+        self.clauses = []
+
+        def rewrite(lits) -> Optional[List[int]]:
+            if substitute is not None:
+                lits = [substitute[lit] for lit in lits]
+            unique = dict.fromkeys(lits)
+            if any(value[lit] == TRUE or lit ^ 1 in unique for lit in unique):
+                return None
+            return [lit for lit in unique if value[lit] != FALSE]
+
+        for cref in chain(clauses, learnts):
+            arena.delete(cref)
+        for lits, cref in chain(((lits, NO_REASON) for lits in binaries),
+                                ((arena.lits(cref), cref) for cref in chain(clauses, learnts))):
+            lits = rewrite(lits)
+            if lits is None:
+                continue
+            if len(lits) == 0:
+                self.ok = False
+                return False
+            if len(lits) == 1:
+                self.assign(lits[0], NO_REASON)
+            elif len(lits) == 2:
+                self.attach_binary(lits[0], lits[1])
+            elif cref != NO_REASON and data[cref + ClauseArena.FLAGS] & ClauseArena.LEARNT:
+                lbd = min(data[cref + ClauseArena.LBD], len(lits))
+                new = arena.add(lits, learnt=True, lbd=lbd)
+                data[new + ClauseArena.ACTIVITY] = data[cref + ClauseArena.ACTIVITY]
+                self.learnts.add(new)
+                self.attach_clause(new)
+            else:
+                new = arena.add(lits)
+                self.clauses.append(new)
+                self.attach_clause(new)
+        self.garbage_collect()
+        if self.propagate() != NO_REASON:
+            self.ok = False
+        return self.ok
+
+    def compute_lbd(self, lits: Iterable[int]) -> int:
+        """
+        Literal block distance: the number of distinct decision levels.
+        """
+        level = self.level
+        return len({level[lit >> 1] for lit in lits})
+
+    def reusable_level(self, assumptions: int = 0) -> int:
+        """
+        Return the decision level a restart can keep the trail down to.
+
+        The decisions up to that level have a higher score than the variable
+        that would be decided next, so VSIDS would make them again right
+        after restarting. The first `assumptions` levels hold assumptions,
+        which would be decided again anyway.
+        """
+        trail_lim = self.trail_lim
+        b = min(assumptions, len(trail_lim))
+        best = self.vsids.peek_best_score(self.value)
+        if best is None:
+            return b
+        activity = self.vsids.activity
+        trail = self.trail
+        while b < len(trail_lim) and activity[trail[trail_lim[b]] >> 1] > best:
+            b += 1
+        return b
+
+    def backtrack(self, b: int):
+        """
+        Undo every assignment above decision level b.
+        """
+        if len(self.trail_lim) <= b:
+            return
+        value = self.value
+        reason = self.reason
+        saved_phase = self.saved_phase
+        trail = self.trail
+        insert = self.vsids.insert
+        start = self.trail_lim[b]
+        for i in range(len(trail) - 1, start - 1, -1):
+            lit = trail[i]
+            var = lit >> 1
+            value[lit] = UNDEF
+            value[lit ^ 1] = UNDEF
+            reason[var] = NO_REASON
+            saved_phase[var] = lit & 1
+            insert(var)
+        del trail[start:]
+        del self.trail_lim[b:]
+        self.qhead = start
+
+    def update_target_phases(self):
+        """
+        Called on a conflict: the levels below the conflicting one form a
+        conflict-free assignment, remember it if it is the longest one since
+        the last restart (target) or overall (best).
+        """
+        size = self.trail_lim[-1] if self.trail_lim else len(self.trail)
+        if size <= self.target_size:
+            return
+        trail = self.trail
+        target_phase = self.target_phase
+        for i in range(size):
+            lit = trail[i]
+            target_phase[lit >> 1] = lit & 1
+        self.target_size = size
+        if size > self.best_size:
+            best_phase = self.best_phase
+            for i in range(size):
+                lit = trail[i]
+                best_phase[lit >> 1] = lit & 1
+            self.best_size = size
+
+    def pick_branching_literal(self) -> Optional[int]:
+        var = self.vsids.get_best_variable(self.value)
+        if var is None:
+            return None
+        polarity = self.polarity
+        if polarity == "saved":
+            sign = self.saved_phase[var]
+        elif polarity == "false":
+            sign = 1
+        elif polarity == "true":
+            sign = 0
+        elif polarity == "random":
+            sign = random.getrandbits(1)
+        else:
+            phases = self.target_phase if polarity == "target" else self.best_phase
+            sign = phases[var]
+            if sign == NO_PHASE:
+                sign = self.saved_phase[var]
+        return (var << 1) | sign
+
+    def interrupt(self):
+        """
+        Make a running solve() return None soon, e.g. from another thread.
+        """
+        self.interrupt_requested = True
+
+    def solve(self, restart_policy: Union[str, RestartPolicy] = "luby",
+              conflict_limit: Optional[int] = None, assumptions: Sequence[int] = (),
+              budget: Optional[Budget] = None) -> Optional[bool]:
+        """
+        Return True if the clauses are satisfiable, with the model readable
+        through model(), and False otherwise.
+
+        restart_policy is "none", "luby", "glucose" or a RestartPolicy.
+
+        The assumptions are literals that must hold in the model, for this
+        call only. They are decided first, one per decision level. If the
+        clauses are unsatisfiable under them, failed_assumptions is set to the
+        assumptions that were needed to refute them; an empty list means the
+        clauses are unsatisfiable regardless of the assumptions.
+
+        When the conflict_limit or the budget runs out, or interrupt() is
+        called, give up and return None, back at level 0 and with the learnt
+        clauses kept; stop_reason tells which limit it was. Counters are
+        compared at every step, and the clock, memory and interrupt event
+        of the budget every CHECK_EVERY conflicts and decisions.
+
+        With a sharing endpoint, learned clauses that pass its thresholds are
+        exported, and the other workers' clauses are imported at every
+        restart and whenever the search is back at level 0.
+
+        The progress callback, if any, gets a stats() snapshot every
+        progress_every conflicts and when the call returns.
+
+        Raise ValueError if an assumption is on a variable the solver does
+        not have; call new_vars() first to add it.
+        """
+        for p in assumptions:
+            if not 2 <= p < 2 * self.num_vars + 2:
+                raise ValueError(f"assumption {lit_to_dimacs(p)} is on variable {p >> 1}, "
+                                 f"the solver has variables 1 to {self.num_vars}")
+        start = time.perf_counter()
+        self.solve_start = start
+        try:
+            return self._search(make_restart_policy(restart_policy), conflict_limit, assumptions, budget)
+        finally:
+            self.solve_seconds += time.perf_counter() - start
+            self.solve_start = None
+            self.budget = self.deadline = None
+            if self.progress_callback is not None:
+                self.progress_callback(self.stats())
+
+    def _search(self, restarts: RestartPolicy, conflict_limit: Optional[int],
+                assumptions: Sequence[int], budget: Optional[Budget]) -> Optional[bool]:
+        self.failed_assumptions = []
+        self.stop_reason = None
+        if not self.ok:
+            return False
+        for p in assumptions:
+            self.frozen[p >> 1] = 1
+        given_assumptions = assumptions
+        if self.substitutions:
+            # assumptions on variables substituted before they were frozen
+            representative = self.representative
+            assumptions = [representative[p] for p in assumptions]
+
+        self.backtrack(0)
+        if self.propagate() != NO_REASON:
+            self.ok = False
+            return False
+
+        # the phases, wrapped in timers when profiling
+        propagate = self.propagate
+        analyze = self.analyze
+        pick_branching_literal = self.pick_branching_literal
+        reduce_db = self.reduce_db
+        backtrack = self.backtrack
+        if self.timers is not None:
+            wrap = self.timers.wrap
+            propagate = wrap("propagate", propagate)
+            analyze = wrap("analyze", analyze)
+            pick_branching_literal = wrap("decide", pick_branching_literal)
+            reduce_db = wrap("reduce", reduce_db)
+            backtrack = wrap("backtrack", backtrack)
+
+        # statistics of the current restart interval
+        conflicts = decisions = lbd_sum = 0
+
+        sharing = self.sharing
+        inprocessor = self.inprocessor
+        phase_seeder = self.phase_seeder
+        propagator = self.propagator
+        max_conflicts = None if conflict_limit is None else self.conflicts + conflict_limit
+        max_propagations = deadline = None
+        if budget is not None:
+            if budget.conflicts is not None:
+                limit = self.conflicts + budget.conflicts
+                max_conflicts = limit if max_conflicts is None else min(max_conflicts, limit)
+            if budget.propagations is not None:
+                max_propagations = self.propagations + budget.propagations
+            if budget.seconds is not None:
+                deadline = self.solve_start + budget.seconds
+        self.budget = budget
+        self.deadline = deadline
+        next_check = self.conflicts + self.decisions + CHECK_EVERY
+        progress_every = self.progress_every if self.progress_callback is not None else 0
+        next_progress = self.conflicts + progress_every
+        value = self.value
+        while True:
+            stop = None
+            if self.interrupt_requested:
+                stop = "interrupted"
+            elif max_conflicts is not None and self.conflicts >= max_conflicts:
+                stop = "conflicts"
+            elif max_propagations is not None and self.propagations >= max_propagations:
+                stop = "propagations"
+            elif budget is not None and self.conflicts + self.decisions >= next_check:
+                next_check = self.conflicts + self.decisions + CHECK_EVERY
+                stop = budget.check(deadline)
+            if stop is not None:
+                self.stop_reason = stop
+                self.interrupt_requested = False
+                backtrack(0)
+                return None
+            restarted = restarts.should_restart()
+            if restarted:
+                b = self.reusable_level(len(assumptions))
+                self.restart_log.append(RestartRecord(conflicts, decisions, lbd_sum / max(conflicts, 1), b))
+                conflicts = decisions = lbd_sum = 0
+                backtrack(b)
+                restarts.on_restart()
+                self.target_size = 0
+                if inprocessor is not None and not inprocessor.on_restart(self):
+                    return False
+                if phase_seeder is not None:
+                    phase_seeder.on_restart(self)
+            if sharing is not None and (restarted or not self.trail_lim):
+                if not self.import_shared_clauses():
+                    return False
+            if self.learnts.should_reduce(self.conflicts):
+                reduce_db()
+
+            lit = None
+            while len(self.trail_lim) < len(assumptions):
+                p = assumptions[len(self.trail_lim)]
+                if value[p] == TRUE:
+                    # already implied: an empty decision level keeps the
+                    # levels in step with the assumptions
+                    self.new_decision_level()
+                elif value[p] == FALSE:
+                    core = self.analyze_final(p ^ 1)
+                    if assumptions is not given_assumptions:
+                        given = dict(zip(assumptions, given_assumptions))
+                        core = [given[lit] for lit in core]
+                    self.failed_assumptions = core
+                    return False
+                else:
+                    lit = p
+                    break
+            if lit is None:
+                lit = pick_branching_literal()
+                if lit is None:
+                    break
+            self.decisions += 1
+            decisions += 1
+            self.new_decision_level()
+            self.assign(lit, NO_REASON)
+
+            while True:
+                confl = propagate()
+                if confl == NO_REASON and propagator is not None:
+                    confl = propagator.propagate(self)
+                    if confl == NO_REASON and self.qhead < len(self.trail):
+                        continue
+                if confl == NO_REASON:
+                    break
+
+                self.conflicts += 1
+                self.update_target_phases()
+                conflicts += 1
+                b, learnt = analyze(confl)
+                if b < 0:
+                    self.ok = False
+                    return False
+
+                self.vsids.decay_scores()
+                lbd = self.compute_lbd(learnt)
+                lbd_sum += lbd
+                restarts.on_conflict(lbd)
+
+                reason = self.add_learnt_clause(learnt, lbd)
+                if sharing is not None:
+                    sharing.export(learnt, lbd)
+                backtrack(b)
+
+                # the learnt clause is unit now, so the next step
+                # must again be unit propagation
+                self.assign(learnt[0], reason)
+
+                if progress_every and self.conflicts >= next_progress:
+                    next_progress += progress_every
+                    self.progress_callback(self.stats())
+
+        return True
+
+    def stats(self) -> SolverStats:
+        """
+        Return a snapshot of the counters; can also be called from a progress
+        callback during solve().
+        """
+        seconds = self.solve_seconds
+        if self.solve_start is not None:
+            seconds += time.perf_counter() - self.solve_start
+        return SolverStats(
+            conflicts=self.conflicts,
+            decisions=self.decisions,
+            propagations=self.propagations,
+            restarts=len(self.restart_log),
+            learnt=self.learnt_total,
+            deleted=self.learnts.deleted,
+            learnts_kept=len(self.learnts),
+            reductions=self.learnts.reductions,
+            mean_lbd=self.lbd_sum / self.learnt_total if self.learnt_total else 0.0,
+            arena_bytes=self.arena.bytes(),
+            arena_wasted_bytes=self.arena.wasted * self.arena.data.itemsize,
+            collections=self.arena.collections,
+            seconds=seconds,
+            phase_seconds=dict(self.timers.seconds) if self.timers is not None else {},
+        )
+
+    def model(self) -> List[bool]:
+        """
+        Return the value of every variable, indexed by variable.
+        """
+        model = [False] + [self.value[var << 1] == TRUE for var in range(1, self.num_vars + 1)]
+        for lit, rep in reversed(self.substitutions):
+            model[lit >> 1] = model[rep >> 1] != bool(rep & 1)
+        return model
@@ -0,0 +1,100 @@
+import sys, time
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+
+
+@dataclass
+class SolverStats:
+    """
+    A snapshot of a solver's counters, as returned by Solver.stats().
+    """
+    conflicts: int = 0
+    decisions: int = 0
+    propagations: int = 0
+    restarts: int = 0
+    learnt: int = 0  # learned clauses added
+    deleted: int = 0  # learned clauses deleted by reductions
+    learnts_kept: int = 0  # learned clauses currently stored
+    reductions: int = 0
+    mean_lbd: float = 0.0  # over all learned clauses
+    arena_bytes: int = 0  # clause arena, deleted clauses included
+    arena_wasted_bytes: int = 0  # deleted clauses not collected yet
+    collections: int = 0  # arena compactions
+    seconds: float = 0.0  # spent in solve() so far
+    phase_seconds: Dict[str, float] = field(default_factory=dict)  # only when profiling
+
+    @property
+    def propagations_per_second(self) -> float:
+        return self.propagations / self.seconds if self.seconds > 0 else 0.0
+
+
+class PhaseTimers:
+    """
+    Wall-clock time spent in each phase of the search. The solver only wraps
+    its phase functions with wrap() when profiling is on, so the timers cost
+    nothing otherwise.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        seconds = self.seconds
+        seconds.setdefault(name, 0.0)
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = fn(*args)
+            seconds[name] += clock() - start
+            return result
+
+        return timed
+
+
+PROGRESS_HEADER = (f"{'seconds':>9} {'conflicts':>10} {'decisions':>11} {'props/s':>10} {'restarts':>8} "
+                   f"{'learnts':>8} {'deleted':>8} {'mean LBD':>8}")
+
+
+def progress_line(stats: SolverStats) -> str:
+    return (f"{stats.seconds:9.2f} {stats.conflicts:10d} {stats.decisions:11d} "
+            f"{stats.propagations_per_second:10.0f} {stats.restarts:8d} {stats.learnts_kept:8d} "
+            f"{stats.deleted:8d} {stats.mean_lbd:8.2f}")
+
+
+class ProgressPrinter:
+    """
+    Default progress callback: prints a table line per call to stderr, with
+    the header before the first one.
+    """
+
+    def __init__(self, file=None):
+        self.file = file or sys.stderr
+        self.header_printed = False
+
+    def __call__(self, stats: SolverStats):
+        if not self.header_printed:
+            print(PROGRESS_HEADER, file=self.file)
+            self.header_printed = True
+        print(progress_line(stats), file=self.file, flush=True)
+
+
+def format_stats(stats: SolverStats) -> str:
+    """
+    Multi-line summary of the counters, and of the phase times if profiled.
+    """
+    lines = [
+        f"Conflicts: {stats.conflicts}",
+        f"Decisions: {stats.decisions}",
+        f"Propagations: {stats.propagations} ({stats.propagations_per_second:.0f} per second)",
+        f"Restarts: {stats.restarts}",
+        f"Learned clauses: {stats.learnt} (deleted {stats.deleted}, kept {stats.learnts_kept}, "
+        f"mean LBD {stats.mean_lbd:.2f})",
+        f"Clause arena: {stats.arena_bytes} bytes ({stats.arena_wasted_bytes} wasted, "
+        f"{stats.collections} collections)",
+    ]
+    if stats.phase_seconds:
+        total = stats.seconds or 1.0
+        for name, seconds in sorted(stats.phase_seconds.items(), key=lambda item: -item[1]):
+            lines.append(f"Time in {name}: {seconds:.6f} seconds ({100 * seconds / total:.1f}%)")
+    return "\n".join(lines)
@@ -0,0 +1,485 @@
+import sys, time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from budget import Budget
+
+# Clauses are handled in the integer literal encoding of solver_core
+# (2*var for a positive literal, 2*var+1 for a negated one). A symmetry is
+# a permutation of the literals, kept as a dict of the literals it moves,
+# that maps the negation of a literal to the negation of its image and the
+# set of clauses onto itself.
+
+Generator = Dict[int, int]
+
+# enough for the symmetric formulas in the tests; about a second of search
+DEFAULT_EFFORT = 400_000
+
+# work (and clauses read) between the checks of the budget
+CHECK_EVERY = 16384
+
+
+@dataclass
+class SymmetryStats:
+    generators: int = 0
+    support: int = 0  # variables moved, summed over the generators
+    clauses: int = 0  # symmetry-breaking clauses added
+    aux_vars: int = 0  # variables they introduced
+    work: int = 0  # spent of the effort, see SymmetryFinder
+    complete: bool = False  # the search finished within the effort limit
+    seconds: float = 0.0
+
+
+class _EffortExceeded(Exception):
+    pass
+
+
+class _Partition:
+    """
+    An ordered partition of the vertices, as in nauty: lab lists the
+    vertices cell by cell, pos[v] is the position of v in lab, cell[v] the
+    position where the cell of v starts and end[start] where it ends. Cells
+    are split in place, so two partitions refined the same way from
+    isomorphic starting points have the same cells at the same positions.
+    The trace records every split, as a certificate of that.
+    """
+
+    def __init__(self, lab: List[int], pos: List[int], cell: List[int], end: List[int]):
+        self.lab = lab
+        self.pos = pos
+        self.cell = cell
+        self.end = end
+        self.trace = []
+
+    def copy(self) -> "_Partition":
+        return _Partition(self.lab[:], self.pos[:], self.cell[:], self.end[:])
+
+    def first_open_cell(self) -> int:
+        """
+        The position of the first cell with more than one vertex, or -1 if
+        the partition is discrete.
+        """
+        i = 0
+        end = self.end
+        while i < len(self.lab):
+            if end[i] - i > 1:
+                return i
+            i = end[i]
+        return -1
+
+    def individualize(self, v: int) -> int:
+        """
+        Split v off the front of its cell. Return the position of its new
+        singleton cell.
+        """
+        lab, pos, cell, end = self.lab, self.pos, self.cell, self.end
+        c = cell[v]
+        e = end[c]
+        u = lab[c]
+        lab[pos[v]] = u
+        pos[u] = pos[v]
+        lab[c] = v
+        pos[v] = c
+        end[c] = c + 1
+        end[c + 1] = e
+        for u in lab[c + 1:e]:
+            cell[u] = c + 1
+        self.trace.append(c)
+        return c
+
+
+class SymmetryFinder:
+    """
+    Find generators of the permutation symmetries of a CNF formula, as the
+    automorphisms of its clause-literal graph: a vertex per literal and per
+    clause, an edge between each clause and its literals and one between
+    the two literals of every variable. Literal and clause vertices start
+    out in different colours, so automorphisms map literals to literals.
+
+    Colour refinement splits the cells of an ordered partition by the
+    number of neighbours in a splitter cell until the partition is
+    equitable. The search individualizes one vertex per level along a first
+    path down to a discrete partition. Then, from the deepest level up, it
+    tries to map the individualized vertex to each other vertex of its
+    cell, skipping those already known to be in its orbit or in the orbit
+    of one that failed: the same individualizations are made on the other
+    side, any vertex of the matching cell being tried, and every discrete
+    partition reached with the same refinement trace gives a permutation
+    that is kept if it is an automorphism. Vertices are individualized in
+    index order, so the generators tend to swap few, low variables, which
+    suits the lex-leader clauses. Every generator found fixes the vertices
+    individualized above its level, so together they generate the
+    automorphism group when the search completes.
+
+    effort bounds the work, counted in adjacency entries scanned by the
+    refinements plus the vertices of every partition copied and the edges
+    of every automorphism check. When it runs out, the generators found so
+    far are kept. With signed, positive and negative literals start out in
+    different colours too, so only renamings of the variables are found,
+    without sign flips. A budget (with deadline as its clock) is checked
+    every CHECK_EVERY clauses read and units of work, and stops the search
+    like the effort does.
+    """
+
+    def __init__(self, num_vars: int, clauses: Iterable[Sequence[int]], effort: int = DEFAULT_EFFORT,
+                 signed: bool = False, budget: Optional[Budget] = None, deadline: Optional[float] = None):
+        self.num_vars = num_vars
+        self.effort = effort
+        self.signed = signed
+        self.budget = budget
+        self.deadline = deadline
+        self.next_check = CHECK_EVERY
+        self.stats = SymmetryStats()
+        self.truncated = False  # not all clauses were read: too many, or out of budget
+        literals = 2 * num_vars
+        # vertex lit - 2 for each literal, then one per distinct clause
+        adj = [[v ^ 1] for v in range(literals)]
+        edges = literals
+        seen = set()
+        for i, clause in enumerate(clauses):
+            if budget is not None and i % CHECK_EVERY == 0 and budget.check(deadline) is not None:
+                self.truncated = True
+                break
+            lits = frozenset(clause)
+            if lits in seen or any(lit ^ 1 in lits for lit in lits):
+                continue  # a duplicate or a tautology
+            seen.add(lits)
+            c = len(adj)
+            adj.append([lit - 2 for lit in lits])
+            for lit in lits:
+                adj[lit - 2].append(c)
+            edges += 2 * len(lits)
+            if 2 * edges > effort:
+                self.truncated = True
+                break  # refining it takes a few times its edges
+        self.adj = adj
+        self.literals = literals
+        self.edges = edges
+
+    def _refine(self, p: _Partition, splitters: Iterable[int]):
+        """
+        Refine p to an equitable partition, starting from the given cells.
+        Only the vertices counted by a splitter are moved: in every cell
+        they go to the back, ordered by their count, and the uncounted rest
+        keeps the front.
+        """
+        adj = self.adj
+        lab, pos, cell, end = p.lab, p.pos, p.cell, p.end
+        trace = p.trace
+        queue = deque(splitters)
+        queued = set(queue)
+        stats = self.stats
+        while queue:
+            w = queue.popleft()
+            queued.discard(w)
+            count: Dict[int, int] = {}
+            get = count.get
+            for v in lab[w:end[w]]:
+                neighbours = adj[v]
+                stats.work += len(neighbours)
+                for u in neighbours:
+                    count[u] = get(u, 0) + 1
+            if stats.work > self.effort:
+                raise _EffortExceeded
+            if self.budget is not None and stats.work >= self.next_check:
+                self.next_check = stats.work + CHECK_EVERY
+                if self.budget.check(self.deadline) is not None:
+                    raise _EffortExceeded
+            touched: Dict[int, List[int]] = {}
+            for u in count:
+                touched.setdefault(cell[u], []).append(u)
+            for c in sorted(touched):
+                e = end[c]
+                members = touched[c]
+                if e - c == 1:
+                    continue
+                members.sort(key=get)
+                if len(members) == e - c and get(members[0]) == get(members[-1]):
+                    continue
+                stats.work += len(members)
+                # move the counted vertices to the back of the cell, in order
+                back = e - len(members)
+                for i, v in enumerate(members):
+                    t = back + i
+                    u = lab[t]
+                    lab[pos[v]] = u
+                    pos[u] = pos[v]
+                    lab[t] = v
+                    pos[v] = t
+                starts = [c] if back > c else []
+                s = back
+                for i in range(1, len(members) + 1):
+                    if i == len(members) or get(members[i]) != get(members[i - 1]):
+                        starts.append(s)
+                        s = back + i
+                for k, s in enumerate(starts):
+                    end[s] = starts[k + 1] if k + 1 < len(starts) else e
+                    if s != c:
+                        for v in lab[s:end[s]]:
+                            cell[v] = s
+                trace.append((c, tuple(starts), get(members[-1])))
+                if c in queued:
+                    new = starts[1:]
+                else:
+                    # all but the largest part: its splits follow from the others
+                    largest = max(starts, key=lambda s: end[s] - s)
+                    new = [s for s in starts if s != largest]
+                for s in new:
+                    queued.add(s)
+                    queue.append(s)
+
+    def _child(self, p: _Partition, v: int) -> _Partition:
+        self.stats.work += len(self.adj)  # for the copy
+        child = p.copy()
+        self._refine(child, [child.individualize(v)])
+        return child
+
+    def _is_automorphism(self, perm: List[int]) -> bool:
+        self.stats.work += self.edges
+        adj = self.adj
+        literals = self.literals
+        for v in range(0, literals, 2):
+            if perm[v] ^ 1 != perm[v ^ 1]:
+                return False
+        for c in range(literals, len(adj)):
+            image = adj[perm[c]]
+            if len(image) != len(adj[c]) or set(image) != {perm[u] for u in adj[c]}:
+                return False
+        return True
+
+    def _extend(self, right: _Partition, level: int) -> Optional[List[int]]:
+        """
+        Individualize on the right what the first path individualized from
+        this level down, trying every vertex of the matching cell. Return an
+        automorphism found at a discrete partition, or None.
+        """
+        if level == len(self.path):
+            left = self.parts[-1]
+            perm = [0] * len(self.adj)
+            for v, u in zip(left.lab, right.lab):
+                perm[v] = u
+            return perm if self._is_automorphism(perm) else None
+        c, v = self.path[level]
+        candidates = sorted(right.lab[c:right.end[c]])
+        if right.cell[v] == c:
+            # fixing what the first path fixed keeps the support small
+            candidates.remove(v)
+            candidates.insert(0, v)
+        for u in candidates:
+            child = self._child(right, u)
+            if child.trace == self.traces[level + 1]:
+                perm = self._extend(child, level + 1)
+                if perm is not None:
+                    return perm
+        return None
+
+    def _first_path(self):
+        """
+        Refine the initial colouring and individualize down to a discrete
+        partition, keeping the partition, the vertex and the trace of each
+        level.
+        """
+        size = len(self.adj)
+        literals = self.literals
+        if self.signed:
+            lab = list(range(0, literals, 2)) + list(range(1, literals, 2)) + list(range(literals, size))
+            cells = [0, self.num_vars, literals]
+        else:
+            lab = list(range(size))
+            cells = [0, literals]
+        # drop the empty colours
+        bounds = cells + [size]
+        cells = [c for k, c in enumerate(cells) if bounds[k + 1] > c]
+        pos = [0] * size
+        for i, v in enumerate(lab):
+            pos[v] = i
+        cell = [0] * size
+        end = [0] * size
+        for k, c in enumerate(cells):
+            e = cells[k + 1] if k + 1 < len(cells) else size
+            end[c] = e
+            for v in lab[c:e]:
+                cell[v] = c
+        p = _Partition(lab, pos, cell, end)
+        self._refine(p, cells)
+        self.parts = [p]
+        self.path = []  # (cell position, vertex) individualized at each level
+        while True:
+            c = p.first_open_cell()
+            if c < 0:
+                break
+            # the smallest vertex: the generators then swap low variables
+            v = min(p.lab[c:p.end[c]])
+            self.path.append((c, v))
+            p = self._child(p, v)
+            self.parts.append(p)
+        self.traces = [q.trace for q in self.parts]
+
+    def labelling(self) -> Optional[List[int]]:
+        """
+        The literal vertices in the order of the discrete partition at the
+        end of the first path, or None if the effort ran out. When colour
+        refinement alone makes the partition discrete, that order depends
+        only on the clauses and not on the numbering of the variables.
+        """
+        if self.truncated:
+            return None
+        try:
+            self._first_path()
+        except _EffortExceeded:
+            return None
+        return [v for v in self.parts[-1].lab if v < self.literals]
+
+    def find(self) -> List[Generator]:
+        """
+        Return the generators found, as literal permutations.
+        """
+        start = time.perf_counter()
+        stats = self.stats
+        generators = []
+        size = len(self.adj)
+        if size == self.literals or self.truncated:
+            # nothing to permute, or the search would not get far
+            stats.complete = size == self.literals and not self.truncated
+            stats.seconds = time.perf_counter() - start
+            return generators
+        literals = self.literals
+        parent = list(range(size))  # union-find of the orbits
+
+        def root(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        try:
+            self._first_path()
+            for level in reversed(range(len(self.path))):
+                c, v = self.path[level]
+                above = self.parts[level]
+                failed = []
+                for w in sorted(above.lab[c:above.end[c]]):
+                    r = root(w)
+                    if r == root(v) or any(root(f) == r for f in failed):
+                        continue
+                    right = self._child(above, w)
+                    perm = None
+                    if right.trace == self.traces[level + 1]:
+                        perm = self._extend(right, level + 1)
+                    if perm is None:
+                        failed.append(w)
+                        continue
+                    for u in range(size):
+                        a, b = root(u), root(perm[u])
+                        if a != b:
+                            parent[a] = b
+                    generator = {lit + 2: perm[lit] + 2 for lit in range(literals) if perm[lit] != lit}
+                    if generator:
+                        generators.append(generator)
+            stats.complete = True
+        except _EffortExceeded:
+            pass
+        stats.generators = len(generators)
+        stats.support = sum(len(g) // 2 for g in generators)
+        stats.seconds = time.perf_counter() - start
+        return generators
+
+
+def lex_leader_clauses(generators: Sequence[Generator], num_vars: int,
+                       max_length: int = 50) -> Tuple[List[List[int]], int]:
+    """
+    Symmetry-breaking clauses that keep only the assignments that are not
+    lexicographically larger than their image under any of the generators,
+    comparing the variables in index order. Some assignment in every orbit
+    of models satisfies them, so they preserve satisfiability.
+
+    For the moved variables x1 < x2 < ... of a generator g they say: if
+    xj == g(xj) for all j < i, then xi <= g(xi). Auxiliary variables e_i
+    stand for the equal prefixes, numbered from num_vars + 1 up; each
+    comparison takes three clauses, and only the first max_length moved
+    variables of a generator are compared. Return the clauses and the new
+    number of variables.
+    """
+    clauses = []
+    next_var = num_vars
+    for g in generators:
+        support = sorted(lit >> 1 for lit in g if not lit & 1)[:max_length]
+        prefix = []  # the negated literal of the equal-prefix variable, if any
+        for i, x in enumerate(support):
+            p = x << 1
+            y = g[p]
+            if y == p ^ 1:
+                # x <= not x, and the prefix can go no further
+                clauses.append(prefix + [p ^ 1])
+                break
+            clauses.append(prefix + [p ^ 1, y])
+            if i == len(support) - 1:
+                break
+            next_var += 1
+            e = next_var << 1
+            # the prefix stays equal unless x is false and y true
+            clauses.append(prefix + [p ^ 1, e])
+            clauses.append(prefix + [y, e])
+            prefix = [e ^ 1]
+    return clauses, next_var
+
+
+def break_symmetries(num_vars: int, clauses: Iterable[Sequence[int]], effort: int = DEFAULT_EFFORT,
+                     max_length: int = 50, budget: Optional[Budget] = None, deadline: Optional[float] = None
+                     ) -> Tuple[List[List[int]], int, List[Generator], SymmetryStats]:
+    """
+    Find symmetries and return the lex-leader clauses breaking them, the new
+    number of variables, the generators and the statistics. The search
+    stops early, keeping the generators found so far, if the effort or the
+    budget runs out.
+    """
+    start = time.perf_counter()
+    finder = SymmetryFinder(num_vars, clauses, effort, budget=budget, deadline=deadline)
+    generators = finder.find()
+    extra, total_vars = lex_leader_clauses(generators, num_vars, max_length)
+    finder.stats.clauses = len(extra)
+    finder.stats.aux_vars = total_vars - num_vars
+    finder.stats.seconds = time.perf_counter() - start
+    return extra, total_vars, generators, finder.stats
+
+
+def format_generator(g: Generator) -> str:
+    """
+    A generator in cycle notation with DIMACS literals. Of a cycle and its
+    negated copy only the first is shown.
+    """
+    def dimacs(lit):
+        return -(lit >> 1) if lit & 1 else lit >> 1
+
+    shown = set()
+    cycles = []
+    for first in sorted(g):
+        if first in shown:
+            continue
+        cycle = [first]
+        lit = g[first]
+        while lit != first:
+            cycle.append(lit)
+            lit = g[lit]
+        shown.update(cycle)
+        shown.update(lit ^ 1 for lit in cycle)
+        cycles.append("(" + " ".join(str(dimacs(lit)) for lit in cycle) + ")")
+    return "".join(cycles)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python symmetry.py <path to file> [effort]")
+        sys.exit(1)
+    from cdcl_solver import formula_clauses
+    from dimacs import read_dimacs
+
+    formula = read_dimacs(sys.argv[1])
+    effort = int(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_EFFORT
+    extra, _, generators, stats = break_symmetries(formula.num_vars, formula_clauses(formula), effort)
+    for g in generators:
+        print(format_generator(g))
+    print(f"{stats.generators} generators moving {stats.support} variables in {stats.seconds:.6f} seconds "
+          f"({'complete' if stats.complete else 'effort limit reached'}), "
+          f"{stats.clauses} symmetry-breaking clauses with {stats.aux_vars} new variables")
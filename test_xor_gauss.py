@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from xor_gauss import Xor, XorMatrix, gauss_preprocess
+
+pytest.importorskip("numpy")
+
+
+def random_system(num_vars: int, num_xors: int, seed: int):
+    rng = random.Random(seed)
+    return [Xor(tuple(sorted(rng.sample(range(1, num_vars + 1), rng.randint(3, 6)))), rng.getrandbits(1))
+            for _ in range(num_xors)]
+
+
+# fewer and more columns than a uint64 word, and a multiple of it
+@pytest.mark.parametrize("num_vars", [20, 64, 200])
+@pytest.mark.parametrize("seed", range(3))
+def test_numpy_rows_match_int_rows(num_vars, seed):
+    xors = random_system(num_vars, num_vars * 9 // 10, seed)
+    ints, packed = XorMatrix(xors, use_numpy=False), XorMatrix(xors, use_numpy=True)
+    assert not ints.use_numpy and packed.use_numpy
+    assert ints.echelon(ints.all_columns) == packed.echelon(packed.all_columns)
+    assert [ints.row(r) for r in range(len(ints))] == [packed.row(r) for r in range(len(packed))]
+
+    # assign columns one by one and pivot as XorPropagator does
+    rng = random.Random(seed)
+    free = ints.all_columns
+    for col in rng.sample(range(ints.rhs_column), ints.rhs_column // 2):
+        free &= ~(1 << col)
+        for matrix in (ints, packed):
+            for r in matrix.rows_with(col):
+                left = matrix.row(r) & free
+                if left:
+                    matrix.eliminate(r, (left & -left).bit_length() - 1)
+                    break
+        assert ints.rows_with(col) == packed.rows_with(col)
+        assert ints.sparse_rows(free) == packed.sparse_rows(free)
+        assert [ints.row(r) for r in range(len(ints))] == [packed.row(r) for r in range(len(packed))]
+
+
+@pytest.mark.parametrize("num_vars", [20, 64, 200])
+# with more XORs than variables the systems are inconsistent, with a few
+# less they imply units and equivalences
+@pytest.mark.parametrize("extra", [5, -2])
+@pytest.mark.parametrize("seed", range(3))
+def test_gauss_preprocess_agrees(num_vars, extra, seed):
+    xors = random_system(num_vars, num_vars + extra, seed)
+    assert gauss_preprocess(xors, use_numpy=False) == gauss_preprocess(xors, use_numpy=True)
@@ -12,8 +12,11 @@ if len(sys.argv) != 3:
 
 if sys.argv[1] == 'original':
     from cdcl_solver_original import parse_dimacs_cnf, cdcl_solve
+    read_formula = lambda path: parse_dimacs_cnf(open(path).read())
 elif sys.argv[1] == 'vsids':
-    from cdcl_solver import parse_dimacs_cnf, cdcl_solve
+    from budget import Budget, Unknown
+    from cdcl_solver import cdcl_solve
+    from dimacs import read_dimacs as read_formula
 else:
     print("The solver you want to use was indicated incorrectly")
     sys.exit(1)
@@ -23,6 +26,13 @@ def handler(signum, frame):
 
 
 def run_with_timeout(func, args=(), timeout=1):
+    if sys.argv[1] == 'vsids':
+        # the vsids solver checks its own budget and stops cleanly
+        result = func(*args, budget=Budget(seconds=timeout))
+        if isinstance(result, Unknown):
+            raise TimeoutError("Timeout")
+        return result
+
     signal.signal(signal.SIGALRM, handler)
     signal.alarm(timeout)
 
@@ -36,11 +46,11 @@ def run_with_timeout(func, args=(), timeout=1):
 def test_files_in_directory(directory, outputtable, timeout):
     for file in os.listdir(directory):
         print("starting file: ", file)
-        start_time = time.time()
-
-        dimacs_cnf = open(directory + "/" + file).read()
-        formula = parse_dimacs_cnf(dimacs_cnf)
+        parse_start = time.time()
+        formula = read_formula(directory + "/" + file)
+        parse_time = time.time() - parse_start
 
+        start_time = time.time()
         try:
             result = run_with_timeout(cdcl_solve, (formula,), timeoutduration)
             duration = time.time() - start_time
@@ -50,13 +60,13 @@ def test_files_in_directory(directory, outputtable, timeout):
             raise Exception("Error: " + str(e))
 
         if result == "Timeout":
-            outputtable.add_row([file, result, ">" + str(timeoutduration) + "sec"])
+            outputtable.add_row([file, result, f"{parse_time:.6f}", ">" + str(timeoutduration) + "sec"])
         else:
             if result:
                 assert result.satisfy(formula)
-                outputtable.add_row([file, "sat", f"{duration:.6f}"])
+                outputtable.add_row([file, "sat", f"{parse_time:.6f}", f"{duration:.6f}"])
             else:
-                outputtable.add_row([file, "unsat", f"{duration:.6f}"])
+                outputtable.add_row([file, "unsat", f"{parse_time:.6f}", f"{duration:.6f}"])
 
         print("finished file", file)
 
@@ -67,8 +77,8 @@ timeoutduration = int(sys.argv[2])
 sat_directory = "./project1-revised-tests/sat"
 unsat_directory = "./project1-revised-tests/unsat"
 
-sat_table = PrettyTable(["SAT Files", "Result", "Execution Time"])
-unsat_table = PrettyTable(["UNSAT Files", "Result", "Execution Time"])
+sat_table = PrettyTable(["SAT Files", "Result", "Parse Time", "Execution Time"])
+unsat_table = PrettyTable(["UNSAT Files", "Result", "Parse Time", "Execution Time"])
 
 random.seed(5201314)
 
@@ -0,0 +1,157 @@
+from array import array
+from typing import Optional
+
+UNDEF = 0  # value of an unassigned literal, as in solver_core
+
+
+class VSIDS:
+    """
+    Variable order for decisions: an indexed binary max-heap over variables
+    keyed by activity (EVSIDS).
+
+    Bumping adds var_inc to a variable's activity and decaying divides
+    var_inc by the decay factor, so older bumps weigh exponentially less
+    without touching every score. When an activity grows past RESCALE_LIMIT
+    all activities and var_inc are scaled down together, which keeps the
+    order unchanged.
+
+    indices[var] is the position of var in heap, or -1 if it is not in it,
+    so a bumped variable is moved up in place (increase-key) and a variable
+    is put back only if it is missing.
+    """
+
+    RESCALE_LIMIT = 1e100
+
+    def __init__(self, decay: float = 0.95):
+        self.activity = [0.0]  # indexed by variable
+        self.heap = []  # variables, heap[0] has the highest activity
+        self.indices = array('i', [-1])
+        self.var_inc = 1.0
+        self.decay = decay
+
+    def add_var(self, var: int):
+        """
+        Register a new variable (vars are added in order 1, 2, ...).
+        """
+        self.activity.append(0.0)
+        self.indices.append(-1)
+        self.insert(var)
+
+    def __contains__(self, var: int) -> bool:
+        return self.indices[var] >= 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def insert(self, var: int):
+        """
+        Put a variable (back) into the heap, e.g. when it gets unassigned.
+        """
+        if self.indices[var] < 0:
+            self.indices[var] = len(self.heap)
+            self.heap.append(var)
+            self._sift_up(len(self.heap) - 1)
+
+    def remove(self, var: int):
+        """
+        Take a variable out of the heap, e.g. one that was substituted away
+        and will never be assigned again.
+        """
+        i = self.indices[var]
+        if i < 0:
+            return
+        heap = self.heap
+        last = heap.pop()
+        self.indices[var] = -1
+        if i < len(heap):
+            heap[i] = last
+            self.indices[last] = i
+            self._sift_up(i)
+            self._sift_down(self.indices[last])
+
+    def bump(self, var: int):
+        activity = self.activity
+        activity[var] += self.var_inc
+        if activity[var] > self.RESCALE_LIMIT:
+            for v in range(1, len(activity)):
+                activity[v] *= 1 / self.RESCALE_LIMIT
+            self.var_inc *= 1 / self.RESCALE_LIMIT
+        if self.indices[var] >= 0:
+            self._sift_up(self.indices[var])
+
+    def decay_scores(self):
+        self.var_inc /= self.decay
+
+    def pop(self) -> int:
+        heap = self.heap
+        var = heap[0]
+        last = heap.pop()
+        self.indices[var] = -1
+        if heap:
+            heap[0] = last
+            self.indices[last] = 0
+            self._sift_down(0)
+        return var
+
+    def get_best_variable(self, value: array) -> Optional[int]:
+        """
+        Remove and return the unassigned variable with the highest activity.
+        Assigned variables on the way are dropped, since backtracking puts
+        them back when they are unassigned.
+        """
+        while self.heap:
+            var = self.pop()
+            if value[var << 1] == UNDEF:
+                return var
+        return None
+
+    def peek_best_score(self, value: array) -> Optional[float]:
+        """
+        Activity of the variable get_best_variable would return, without
+        removing it.
+        """
+        while self.heap:
+            var = self.heap[0]
+            if value[var << 1] == UNDEF:
+                return self.activity[var]
+            self.pop()
+        return None
+
+    def _sift_up(self, i: int):
+        heap = self.heap
+        indices = self.indices
+        activity = self.activity
+        var = heap[i]
+        act = activity[var]
+        while i > 0:
+            parent = (i - 1) >> 1
+            p = heap[parent]
+            if activity[p] >= act:
+                break
+            heap[i] = p
+            indices[p] = i
+            i = parent
+        heap[i] = var
+        indices[var] = i
+
+    def _sift_down(self, i: int):
+        heap = self.heap
+        indices = self.indices
+        activity = self.activity
+        n = len(heap)
+        var = heap[i]
+        act = activity[var]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            c = heap[child]
+            if activity[c] <= act:
+                break
+            heap[i] = c
+            indices[c] = i
+            i = child
+        heap[i] = var
+        indices[var] = i
@@ -0,0 +1,333 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from budget import Budget
+from solver_core import NO_REASON, TRUE, UNDEF, Solver
+
+try:
+    import numpy as np
+except ImportError:  # rows are then packed into Python ints instead
+    np = None
+
+# Clauses are handled in the integer literal encoding of solver_core
+# (2*var for a positive literal, 2*var+1 for a negated one).
+
+# below this many variables, Python int rows are eliminated faster than
+# NumPy ones (by gauss_preprocess; the propagator uses ints, see XorPropagator)
+NUMPY_MIN_COLUMNS = 128
+
+# clauses find_xors looks at between the checks of the budget
+CHECK_EVERY = 4096
+
+
+@dataclass(frozen=True)
+class Xor:
+    """
+    The constraint vars[0] ^ vars[1] ^ ... == rhs.
+    """
+    vars: Tuple[int, ...]  # sorted
+    rhs: int  # 0 or 1
+
+
+@dataclass
+class XorStats:
+    xors: int = 0  # constraints found
+    columns: int = 0  # variables in them
+    eliminations: int = 0
+    implied: int = 0  # literals assigned by the propagator
+    conflicts: int = 0
+    seconds: float = 0.0
+    disabled: bool = False  # too few eliminations found anything
+
+
+def _parity(x: int) -> int:
+    return bin(x).count("1") & 1
+
+
+def find_xors(clauses: Iterable[Sequence[int]], max_size: int = 6, budget: Optional[Budget] = None,
+              deadline: Optional[float] = None) -> List[Xor]:
+    """
+    Find the XOR constraints encoded directly as CNF: the 2^(k-1) clauses
+    over the same k variables that have an even (or odd) number of negated
+    literals forbid every assignment whose XOR is that parity. Clauses with
+    more than max_size literals are not looked at, nor binary ones: a
+    two-variable XOR is an equivalence, which the preprocessor and
+    equivalent-literal substitution already handle.
+
+    The budget is checked (with deadline as its clock) every CHECK_EVERY
+    clauses; once it runs out, no XORs are returned.
+    """
+    # variables of a clause -> its literals, sorted
+    groups: Dict[Tuple[int, ...], List[List[int]]] = {}
+    for i, clause in enumerate(clauses):
+        if budget is not None and i % CHECK_EVERY == 0 and budget.check(deadline) is not None:
+            return []
+        if not 2 < len(clause) <= max_size:
+            continue
+        lits = sorted(clause)
+        groups.setdefault(tuple([lit >> 1 for lit in lits]), []).append(lits)
+
+    xors = []
+    for key, group in groups.items():
+        need = 1 << (len(key) - 1)
+        if len(group) < need or len(set(key)) != len(key):
+            continue  # too few clauses, or tautologies
+        # bit i of a sign pattern is set if the i-th variable is negated
+        patterns: Set[int] = set()
+        for lits in group:
+            signs = 0
+            for i, lit in enumerate(lits):
+                signs |= (lit & 1) << i
+            patterns.add(signs)
+        for parity in (0, 1):
+            if sum(1 for signs in patterns if _parity(signs) == parity) == need:
+                # the clauses forbid the assignments with XOR == parity
+                xors.append(Xor(key, parity ^ 1))
+    return xors
+
+
+class XorMatrix:
+    """
+    A system of XOR constraints as a bit matrix over GF(2): a row per
+    constraint, a column per variable and a last column for the right-hand
+    sides, eliminated in place. With NumPy the rows are packed 64 columns to
+    a uint64 word and a pivot is eliminated from every row with one
+    vectorized XOR; without it, every row is a Python int used as a bit
+    vector. By default NumPy is used if it is installed and the system has
+    NUMPY_MIN_COLUMNS variables.
+    """
+
+    def __init__(self, xors: Sequence[Xor], use_numpy: Optional[bool] = None):
+        self.vars = sorted({var for xor in xors for var in xor.vars})
+        self.column = {var: i for i, var in enumerate(self.vars)}
+        self.rhs_column = len(self.vars)
+        self.all_columns = (1 << self.rhs_column) - 1
+        rows = []
+        for xor in xors:
+            row = xor.rhs << self.rhs_column
+            for var in xor.vars:
+                row ^= 1 << self.column[var]
+            rows.append(row)
+        if use_numpy is None:
+            use_numpy = np is not None and self.rhs_column >= NUMPY_MIN_COLUMNS
+        elif use_numpy and np is None:
+            raise ImportError("use_numpy=True needs numpy")
+        self.use_numpy = use_numpy
+        if use_numpy:
+            self.words = (self.rhs_column + 64) // 64
+            self.matrix = self._pack(rows)
+        else:
+            self.rows = rows
+
+    def __len__(self):
+        return self.matrix.shape[0] if self.use_numpy else len(self.rows)
+
+    def _pack(self, rows: Sequence[int]):
+        size = self.words * 8
+        data = b"".join(row.to_bytes(size, "little") for row in rows)
+        return np.frombuffer(data, dtype="<u8").reshape(len(rows), self.words).astype(np.uint64)
+
+    def _column_bits(self, col: int):
+        return (self.matrix[:, col >> 6] >> np.uint64(col & 63)) & np.uint64(1)
+
+    def row(self, r: int) -> int:
+        if self.use_numpy:
+            return int.from_bytes(self.matrix[r].astype("<u8").tobytes(), "little")
+        return self.rows[r]
+
+    def row_vars(self, row: int) -> List[int]:
+        return [var for i, var in enumerate(self.vars) if row >> i & 1]
+
+    def rows_with(self, col: int) -> List[int]:
+        """
+        The rows with a 1 in the column.
+        """
+        if self.use_numpy:
+            return np.flatnonzero(self._column_bits(col)).tolist()
+        return [r for r, row in enumerate(self.rows) if row >> col & 1]
+
+    def eliminate(self, r: int, col: int):
+        """
+        Add row r to every other row with a 1 in the column, so r is the
+        only one left.
+        """
+        if self.use_numpy:
+            targets = self._column_bits(col).astype(bool)
+            targets[r] = False
+            self.matrix[targets] ^= self.matrix[r]
+            return
+        rows = self.rows
+        pivot = rows[r]
+        bit = 1 << col
+        for i, row in enumerate(rows):
+            if row & bit and i != r:
+                rows[i] = row ^ pivot
+
+    def sparse_rows(self, free: int, max_left: int = 1) -> List[int]:
+        """
+        The rows with at most max_left 1s among the columns of the mask free.
+        """
+        if self.use_numpy:
+            left = self.matrix & self._pack([free])[0]
+            counts = np.unpackbits(left.view(np.uint8), axis=1).sum(axis=1)
+            return np.flatnonzero(counts <= max_left).tolist()
+        return [r for r, row in enumerate(self.rows) if bin(row & free).count("1") <= max_left]
+
+    def echelon(self, free: int) -> List[int]:
+        """
+        Gauss-Jordan elimination with pivots among the columns of the mask
+        free. Return the pivot column of each row, -1 for the rows that got
+        none.
+        """
+        basic = [-1] * len(self)
+        for col in range(self.rhs_column):
+            if not free >> col & 1:
+                continue
+            for r in self.rows_with(col):
+                if basic[r] < 0:
+                    basic[r] = col
+                    self.eliminate(r, col)
+                    break
+        return basic
+
+
+def gauss_preprocess(xors: Sequence[Xor], use_numpy: Optional[bool] = None) -> Optional[List[List[int]]]:
+    """
+    Solve the XOR system on its own. Return None if it is inconsistent,
+    else the clauses it implies that the CDCL search can use directly: the
+    rows of the reduced system with one variable as unit clauses, and those
+    with two variables as equivalences.
+    """
+    matrix = XorMatrix(xors, use_numpy)
+    matrix.echelon(matrix.all_columns)
+    clauses = []
+    for r in matrix.sparse_rows(matrix.all_columns, max_left=2):
+        row = matrix.row(r)
+        rhs = row >> matrix.rhs_column & 1
+        vars = matrix.row_vars(row)
+        if not vars:
+            if rhs:
+                return None
+        elif len(vars) == 1:
+            clauses.append([(vars[0] << 1) | (rhs ^ 1)])
+        else:
+            # a ^ b == rhs
+            a, b = vars
+            clauses.append([a << 1, (b << 1) | (rhs ^ 1)])
+            clauses.append([(a << 1) | 1, (b << 1) | rhs])
+    return clauses
+
+
+class XorPropagator:
+    """
+    Gauss-Jordan propagation during the search, plugged into a Solver.
+
+    The matrix is kept in reduced row echelon form with every row's pivot
+    ("basic") column unassigned, whenever the row has an unassigned column
+    at all. At every propagation fixpoint, each row whose basic variable
+    was assigned since is pivoted on another unassigned column of the row,
+    which costs one elimination instead of a full one; backtracking keeps
+    the matrix as it is, since any basis will do. Then a row with no
+    unassigned column and the wrong parity is a conflict, and a row whose
+    basic variable is its only unassigned one implies it. Either way the
+    row, a sum of the original XORs, is turned into a clause over its
+    variables that explains it, and handed to Solver.explain(). The
+    variables of the system are frozen so inprocessing does not substitute
+    them.
+
+    The propagator turns itself off when fewer than min_useful of the last
+    check_every calls implied a literal or found a conflict: then unit
+    propagation on the clauses of the XORs keeps up on its own.
+
+    Its rows are Python ints unless use_numpy is given: every call reads
+    rows back one at a time, which costs NumPy more than its vectorized
+    eliminations save, up to at least 1500 variables.
+    """
+
+    def __init__(self, xors: Sequence[Xor], use_numpy: Optional[bool] = False,
+                 check_every: int = 256, min_useful: float = 0.05):
+        self.matrix = XorMatrix(xors, use_numpy)
+        self.basic = self.matrix.echelon(self.matrix.all_columns)
+        self.stats = XorStats(xors=len(xors), columns=len(self.matrix.vars))
+        self.last = None  # (assigned, true) masks of the last call that found nothing
+        self.check_every = check_every
+        self.min_useful = min_useful
+        self.calls = 0
+        self.useful = 0  # calls since the last check that found something
+
+    def attach(self, solver: Solver):
+        for var in self.matrix.vars:
+            solver.freeze(var)
+        solver.propagator = self
+
+    def propagate(self, solver: Solver) -> int:
+        """
+        Return a conflict for Solver.analyze(), or NO_REASON once every row
+        is consistent and nothing more is implied.
+        """
+        stats = self.stats
+        if stats.disabled:
+            return NO_REASON
+        matrix = self.matrix
+        value = solver.value
+        assigned = true = 0
+        for i, var in enumerate(matrix.vars):
+            v = value[var << 1]
+            if v != UNDEF:
+                assigned |= 1 << i
+                if v == TRUE:
+                    true |= 1 << i
+        if (assigned, true) == self.last:
+            return NO_REASON
+        start = time.perf_counter()
+        self.calls += 1
+        if self.calls % self.check_every == 0:
+            if self.useful < self.min_useful * self.check_every:
+                stats.disabled = True
+            self.useful = 0
+        free = matrix.all_columns & ~assigned
+        basic = self.basic
+        for r, col in enumerate(basic):
+            if col >= 0 and assigned >> col & 1:
+                left = matrix.row(r) & free
+                if left:
+                    col = (left & -left).bit_length() - 1
+                    basic[r] = col
+                    matrix.eliminate(r, col)
+                    stats.eliminations += 1
+
+        rhs_column = matrix.rhs_column
+        levels = len(solver.trail_lim)
+        trail_size = len(solver.trail)
+        found = False
+        for r in matrix.sparse_rows(free):
+            row = matrix.row(r)
+            left = row & free
+            # the XOR of the free variables must be need
+            need = (row >> rhs_column & 1) ^ _parity(row & true)
+            if not left and not need:
+                continue
+            # each assigned variable as its false literal
+            lits = [(var << 1) | (true >> matrix.column[var] & 1)
+                    for var in matrix.row_vars(row & assigned)]
+            if left:
+                var = matrix.vars[left.bit_length() - 1]
+                if value[var << 1] != UNDEF:
+                    continue  # implied by an earlier row, checked again on the next call
+                lits.insert(0, (var << 1) | (need ^ 1))
+                stats.implied += 1
+            else:
+                stats.conflicts += 1
+            if not found:
+                found = True
+                self.useful += 1
+            confl = solver.explain(lits)
+            if confl != NO_REASON or len(solver.trail_lim) != levels:
+                # explain() backtracked, so the other rows are stale
+                stats.seconds += time.perf_counter() - start
+                return confl
+        if len(solver.trail) == trail_size:
+            self.last = (assigned, true)
+        stats.seconds += time.perf_counter() - start
+        return NO_REASON